@@ -1,55 +1,140 @@
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime, date
 import pandas as pd
 import altair as alt
-import json
-import io
 import traceback
-import numpy as np
+from busca import IndiceBusca
+from carga import CargaFragmentada, CargaPlanilha
+from consultas import ConsultaTabela, Filtros, contagem
+from cubo import GRANULARIDADES, CuboInteracoes
+from espelho import EspelhoLocal
+from exportacao import FORMATOS, gerar_exportacao
+from fila_escrita import ao_enviar
+from memo import CacheLRU
+import metricas
+from metricas import cronometrado, medir
+from planilha import fontes_configuradas, get_acesso
+from segurados import ResumoSegurados
+from status import interpretar_status
+from tabela import TabelaInteracoes, relatorio_memoria
+from resumo import MODELO_PADRAO, get_carregador
 
 st.set_page_config(layout="wide", page_title="Interações - Dashboard", initial_sidebar_state="collapsed")
+metricas.iniciar("painel")
 
 # --------------------------
-# Config Google Sheets
+# Config Google Sheets (cliente, credenciais e retentativas em planilha.py)
 # --------------------------
-SHEET_ID = "1331BNS5F0lOsIT9fNDds4Jro_nMYvfeWGVeqGhgj_BE"  # ajuste se necessário
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-
-def load_sheet_data():
+def _config(chave, padrao):
+    # lê uma opção de st.secrets sem quebrar quando não há secrets configurados
     try:
-        gcp_key = json.loads(st.secrets["gcp_key"])
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(gcp_key, scope)
-        client = gspread.authorize(creds)
-        sheet = client.open_by_key(SHEET_ID).sheet1
-        dados = sheet.get_all_records()
-        return pd.DataFrame(dados)
+        return st.secrets.get(chave, padrao)
+    except Exception:
+        return padrao
+
+# tempo (segundos) que os dados ficam em cache antes de buscar linhas novas na planilha
+CACHE_TTL_SEGUNDOS = float(_config("cache_ttl_segundos", 300))
+# espelho local opcional (caminho do arquivo SQLite); vazio desativa
+ESPELHO_LOCAL = _config("espelho_local", "")
+# True: o painel lê só do espelho, sem chamar a API (ex.: API lenta ou fora do ar)
+ESPELHO_SOMENTE_LOCAL = bool(_config("espelho_somente_local", False))
+# log dividido em várias planilhas/abas (lista [[planilhas]], ver planilha.py); vazio = só a planilha padrão
+FONTES = fontes_configuradas(_config("planilhas", []))
+# fontes lidas ao mesmo tempo e tempo (segundos) até reler as fontes que não são a ativa
+PLANILHAS_PARALELO = int(_config("planilhas_paralelo", 4))
+PLANILHAS_TTL_ARQUIVO = float(_config("planilhas_ttl_arquivo", 3600))
+
+# tempos por etapa: painel na barra lateral, log JSON (uma linha por execução) e arquivo Prometheus; vazio desativa
+DEBUG_TEMPOS = bool(_config("debug_tempos", False))
+METRICAS_LOG = _config("metricas_log_path", "")
+METRICAS_PROMETHEUS = _config("metricas_prometheus_path", "")
+
+# aquece em segundo plano o modelo de resumo usado pela página de importação, para que ele já
+# esteja carregado quando alguém abrir a página (não bloqueia o painel)
+if _config("resumo_aquecer", True):
+    get_carregador(_config("resumo_modelo", MODELO_PADRAO), _config("resumo_backend", "torch"),
+                   int(_config("resumo_torch_threads", 0))).aquecer()
+
+@st.cache_resource
+def get_espelho():
+    return EspelhoLocal(ESPELHO_LOCAL) if ESPELHO_LOCAL else None
+
+@st.cache_resource
+def get_carga():
+    # cache da planilha compartilhado entre sessões/reruns (ver carga.py); com várias fontes,
+    # um cache por fonte e a coluna "fonte" na tabela unida. Linhas gravadas pela fila de
+    # escrita (página de importação) expiram o cache da fonte que as recebeu
+    if len(FONTES) > 1:
+        carga = CargaFragmentada(get_acesso, FONTES, get_espelho(), CACHE_TTL_SEGUNDOS, ESPELHO_SOMENTE_LOCAL,
+                                 PLANILHAS_PARALELO, PLANILHAS_TTL_ARQUIVO)
+    else:
+        fonte = FONTES[0]
+        carga = CargaPlanilha(get_acesso, get_espelho(), CACHE_TTL_SEGUNDOS, ESPELHO_SOMENTE_LOCAL,
+                              planilha=fonte.planilha, aba=fonte.aba)
+    ao_enviar(carga.marcar_escrita)
+    return carga
+
+@cronometrado("load_sheet_data", linhas=lambda r: len(r[0]))
+def load_sheet_data(forcar=False):
+    # (df, versão, delta) da mesma leitura: outra sessão pode recarregar os dados a qualquer momento
+    try:
+        return get_carga().carregar(forcar, avisar=st.warning)
     except Exception:
         st.error("❌ Erro ao conectar com a planilha. Verifique as credenciais em st.secrets e se o client_email tem permissão de Editor na planilha.")
         with st.expander("Detalhes do erro (apenas para debug)"):
             st.text(traceback.format_exc())
         st.stop()
 
+# agregados e gráficos da aba de análise memoizados por (versão dos dados, fonte, filtros)
+@st.cache_resource
+def get_cache_analise():
+    return CacheLRU(maximo=int(_config("cache_analise_max", 64)))
+
+# arquivos exportados por (versão dos dados, escopo, filtros, formato); poucos, pois ocupam memória
+@st.cache_resource
+def get_cache_exportacao():
+    return CacheLRU(maximo=int(_config("cache_exportacao_max", 4)))
+
+def _gerar_arquivo(montar_df, formato):
+    with medir(f"exportacao ({formato})") as m:
+        arquivo = gerar_exportacao(montar_df(), formato)
+        m["linhas"] = arquivo["linhas"]
+    return arquivo
+
+def secao_exportacao(escopo, chave, montar_df, nome_base, rotulo):
+    """Botão que gera o arquivo só quando pedido e depois oferece o download (com tempo e tamanho)."""
+    col_fmt, col_botao = st.columns([2, 3])
+    with col_fmt:
+        formato = st.selectbox("Formato", list(FORMATOS), key=f"formato_{escopo}", label_visibility="collapsed")
+    pedido = (versao_atual, chave, formato)
+    with col_botao:
+        if st.button(f"Preparar {rotulo}", key=f"preparar_{escopo}"):
+            st.session_state[f"exportacao_{escopo}"] = pedido
+    if st.session_state.get(f"exportacao_{escopo}") != pedido:
+        return
+    arquivo = get_cache_exportacao().obter(versao_atual, (escopo, chave, formato),
+                                            lambda: _gerar_arquivo(montar_df, formato))
+    st.download_button(f"Download {rotulo} ({formato})", data=arquivo["dados"],
+                       file_name=f"{nome_base}.{arquivo['extensao']}", mime=arquivo["mime"], key=f"download_{escopo}")
+    st.caption(f"{arquivo['linhas']} linha(s) · {arquivo['bytes'] / 1024:.1f} KB · gerado em {arquivo['segundos']:.2f}s")
+
+def invalidar_cache_planilha():
+    # força leitura completa na próxima chamada de load_sheet_data
+    get_carga().invalidar()
+    get_cache_analise().limpar()
+    get_cache_exportacao().limpar()
+
 # --------------------------
 # Utilitários gerais
 # --------------------------
-def make_unique_cols(df):
-    cols = []
-    seen = {}
-    for c in df.columns:
-        if c in seen:
-            seen[c] += 1
-            new = f"{c}_{seen[c]}"
-        else:
-            seen[c] = 0
-            new = c
-        cols.append(new)
-    df = df.copy()
-    df.columns = cols
-    return df
-
-def gerar_bar_chart(series: pd.Series, titulo: str, horizontal: bool = False):
+def mostrar_tempos():
+    # fecha as medições desta execução (log/Prometheus, se configurados) e mostra o painel de debug;
+    # chamada antes de qualquer st.stop() de uma execução normal, para que ela também seja registrada
+    etapas = metricas.finalizar(METRICAS_LOG, METRICAS_PROMETHEUS)
+    if st.sidebar.checkbox("⏱️ Mostrar tempos", value=DEBUG_TEMPOS):
+        metricas.mostrar_painel(etapas, st.sidebar)
+
+def gerar_bar_chart(series: pd.Series, titulo: str, horizontal: bool = False, cronologico: bool = False):
     df_plot = series.reset_index()
     df_plot.columns = ["categoria", "quantidade"]
     df_plot["categoria"] = df_plot["categoria"].astype(str)
@@ -60,32 +145,15 @@ def gerar_bar_chart(series: pd.Series, titulo: str, horizontal: bool = False):
         ).properties(title=titulo, width=900, height=400)
     else:
         chart = alt.Chart(df_plot).mark_bar().encode(
-            x=alt.X("categoria:N", sort='-y'),
+            x=alt.X("categoria:N", sort=None if cronologico else '-y'),
             y=alt.Y("quantidade:Q")
         ).properties(title=titulo, width=900, height=400)
     return chart
 
-def baixar_csv_bytes(df_in):
-    buffer = io.StringIO()
-    df_in.to_csv(buffer, index=False)
-    return buffer.getvalue().encode("utf-8")
-
-def interpretar_status(texto):
-    t = str(texto).lower()
-    if any(k in t for k in ["reunião marcada", "reunião agendada", "agendada", "agendamento"]):
-        return "✅ Reunião marcada"
-    if any(k in t for k in ["solicitei retorno", "aguardando retorno", "aguardando disponibilidade", "aguardando"]):
-        return "⏳ Aguardando retorno"
-    if any(k in t for k in ["enviei e-mail", "e-mail enviado", "enviei email", "contato inicial", "primeiro contato"]):
-        return "📨 Contato inicial"
-    if any(k in t for k in ["finalizado", "concluído", "concluido", "encerrado"]):
-        return "🏁 Finalizado"
-    return "ℹ️ Em andamento"
-
 # --------------------------
 # Leitura e pré-processamento
 # --------------------------
-df = load_sheet_data()
+df, versao_atual, delta_atual = load_sheet_data()
 
 expected_cols = ["data_hora", "segurado", "canal", "conteudo", "tipo_evento", "integracao"]
 missing = [c for c in expected_cols if c not in df.columns]
@@ -93,45 +161,56 @@ if missing:
     st.error(f"Colunas faltando na planilha: {missing}")
     st.stop()
 
-# Normaliza colunas texto
-for c in ["segurado", "canal", "conteudo", "tipo_evento", "integracao"]:
-    df[c] = df[c].astype(str).str.strip()
-
-# Conversão robusta de datas (aceita serial Excel e strings)
-def excel_serial_to_datetime(serial):
-    try:
-        return pd.to_datetime(float(serial), unit='d', origin='1899-12-30')
-    except Exception:
-        return pd.NaT
-
-def parse_date_value(v):
-    if pd.isna(v) or (isinstance(v, str) and v.strip() == ""):
-        return pd.NaT
-    if isinstance(v, (pd.Timestamp, datetime)):
-        return pd.to_datetime(v)
-    try:
-        if isinstance(v, (int, float, np.integer, np.floating)):
-            return excel_serial_to_datetime(v)
-    except:
-        pass
-    s = str(v).strip()
-    try:
-        sr = s.replace(",", ".")
-        if all(ch.isdigit() or ch == '.' for ch in sr):
-            return excel_serial_to_datetime(float(sr))
-    except:
-        pass
-    try:
-        return pd.to_datetime(s, dayfirst=True, errors='coerce')
-    except:
-        return pd.NaT
-
-# cria colunas derivadas no DataFrame original (antes de renomear colunas)
-df["data_hora_parsed"] = df["data_hora"].apply(parse_date_value)
-df["data_hora_fmt"] = df["data_hora_parsed"].dt.strftime("%d/%m/%Y %H:%M")
-df.loc[df["data_hora_parsed"].isna(), "data_hora_fmt"] = ""
-df["ano_mes"] = df["data_hora_parsed"].dt.to_period("M")
-df["conteudo_lower"] = df["conteudo"].str.lower()
+# tabela compacta (categorias, string pyarrow e uma coluna datetime64), montada uma vez por
+# versão dos dados e compartilhada entre sessões; normaliza textos e converte datas
+@st.cache_resource(max_entries=2)
+def get_tabela(versao, _df):
+    return TabelaInteracoes(_df)
+
+with medir("pre_processamento") as m:
+    tabela = get_tabela(versao_atual, df)
+    m["linhas"] = len(tabela)
+
+# estruturas derivadas da tabela: uma por versão dos dados, como a tabela (uma sessão que
+# ainda está na versão anterior não enxerga a estrutura de outra versão). A última montada de
+# cada tipo é a base da próxima: quando a leitura só trouxe linhas novas, só elas são processadas
+@st.cache_resource
+def get_ultimas_estruturas():
+    return {}
+
+def _estrutura_da_versao(nome, vazia, versao, tabela, delta):
+    ultimas = get_ultimas_estruturas()
+    estrutura = ultimas.get(nome, vazia).atualizar(tabela, versao, delta)
+    ultimas[nome] = estrutura
+    return estrutura
+
+# resumo por segurado (contagem, datas, canal, status e linhas ordenadas por data)
+@st.cache_resource(max_entries=2)
+def get_resumo_segurados(versao, _tabela, _delta):
+    return _estrutura_da_versao("resumo_segurados", ResumoSegurados(), versao, _tabela, _delta)
+
+with medir("resumo_segurados") as m:
+    resumo_segurados = get_resumo_segurados(versao_atual, tabela, delta_atual)
+    m["linhas"] = len(resumo_segurados.entradas)
+
+# índice de busca textual (conteúdo e, se houver, assunto)
+@st.cache_resource(max_entries=2)
+def get_indice_busca(versao, _tabela, _delta):
+    return _estrutura_da_versao("indice_busca", IndiceBusca(), versao, _tabela, _delta)
+
+with medir("indice_busca") as m:
+    indice_busca = get_indice_busca(versao_atual, tabela, delta_atual)
+    m["linhas"] = indice_busca.linhas
+
+# cubo de contagens por dia × canal × integração × tipo de evento × status (e segurado):
+# agregados, gráficos por período e o seletor de datas somam células em vez de varrer linhas
+@st.cache_resource(max_entries=2)
+def get_cubo(versao, _tabela, _delta):
+    return _estrutura_da_versao("cubo", CuboInteracoes(), versao, _tabela, _delta)
+
+with medir("cubo") as m:
+    cubo = get_cubo(versao_atual, tabela, delta_atual)
+    m["linhas"] = cubo.linhas
 
 # --------------------------
 # UI: topo (Abrir abas + Recarregar dados robusto)
@@ -147,6 +226,7 @@ with col2:
 with col3:
     if st.button("🔄 Recarregar dados"):
         try:
+            invalidar_cache_planilha()
             st.session_state.clear()
             st.experimental_rerun()
         except AttributeError:
@@ -165,49 +245,101 @@ if st.session_state.get("_needs_reload"):
 if not st.session_state.show_tabs:
     st.sidebar.success("📄 Páginas carregadas no menu →")
     st.markdown("<br/><br/><h2 style='text-align:center'>Clique em Abrir abas para acessar o painel principal</h2>", unsafe_allow_html=True)
+    mostrar_tempos()
     st.stop()
 
+stats_api = get_acesso().estatisticas()
+st.sidebar.caption(f"API Sheets: {stats_api['chamadas']} chamada(s) · {stats_api['segundos']:.1f}s · {stats_api['retentativas']} retentativa(s)")
+
 # --------------------------
-# Prepare tabela_full com colunas únicas
+# Colunas disponíveis (tabela compacta compartilhada: não alterar)
 # --------------------------
-tabela_full = df.copy()
-# renomeia coluna de exibição e garante unicidade de colunas
-if "data_hora_fmt" in tabela_full.columns:
-    tabela_full = tabela_full.rename(columns={"data_hora_fmt": "data_hora"})
-tabela_full = make_unique_cols(tabela_full)
-available_cols = tabela_full.columns.tolist()
-
-# cria coluna datetime consistente para filtros/ordenacao (não dependemos do nome original)
-# tenta localizar a coluna exibida de data_hora (pode ser 'data_hora' ou 'data_hora_1' etc) e a parsed original
-def find_col(prefix, cols):
-    for c in cols:
-        if c == prefix or c.startswith(prefix + "_"):
-            return c
-    return None
-
-# localiza coluna que contém os valores originais de data_hora (após make_unique_cols)
-col_data_display = find_col("data_hora", tabela_full.columns)
-# preferir coluna já parseada se existir (data_hora_parsed ou data_hora_parsed_1)
-col_parsed = find_col("data_hora_parsed", tabela_full.columns)
-# se não existir parsed (raro), criar a partir da coluna display
-if col_parsed is None and col_data_display is not None:
-    tabela_full["data_hora_parsed_internal"] = pd.to_datetime(tabela_full[col_data_display], dayfirst=True, errors='coerce')
-    col_parsed = "data_hora_parsed_internal"
-elif col_parsed is None:
-    tabela_full["data_hora_parsed_internal"] = pd.NaT
-    col_parsed = "data_hora_parsed_internal"
+# colunas disponíveis incluem as derivadas (data_hora formatada, ano_mes, conteudo_lower), calculadas sob demanda
+available_cols = tabela.colunas
 
 # --------------------------
 # Seção principal: seleção de abas
 # --------------------------
 aba = st.radio("Escolha uma aba:", ["Análise por filtros", "Dados completos"], horizontal=True)
 
-# localizar outras colunas fundamentais (após make_unique_cols)
-col_seg = find_col("segurado", tabela_full.columns)
-col_canal = find_col("canal", tabela_full.columns)
-col_conteudo = find_col("conteudo", tabela_full.columns)
-col_tipo = find_col("tipo_evento", tabela_full.columns)
-col_integr = find_col("integracao", tabela_full.columns)
+# consultas da aba de análise: índices em memória montados uma vez por versão dos dados
+# (compartilhados entre sessões) ou, com o espelho local ativo, SQL sobre o espelho
+@st.cache_resource(max_entries=2)
+def get_consulta(versao, _tabela):
+    return ConsultaTabela(_tabela)
+
+with medir("indice_filtros"):
+    fonte = get_espelho() if get_espelho() is not None and _config("espelho_consultas", True) else get_consulta(versao_atual, tabela)
+
+def _calcular_analise(filtros):
+    # só o cliente selecionado: tudo sai do resumo por segurado, sem filtrar nem ordenar a tabela
+    so_cliente = filtros.segurado and filtros == Filtros(segurado=filtros.segurado)
+    if so_cliente and resumo_segurados.entrada(filtros.segurado) is not None:
+        return _calcular_analise_cliente(filtros.segurado)
+    # sem segurado, o cubo responde (o índice de filtro é mais rápido para um segurado só)
+    via_cubo = not filtros.segurado and cubo.atende(filtros)
+    with medir("agregados (cubo)" if via_cubo else "agregados") as m:
+        analise = dict((cubo if via_cubo else fonte).agregados(filtros))
+        m["linhas"] = analise["total"]
+    if analise["total"] == 0:
+        return analise
+    _graficos(analise)
+    with medir("status") as m:
+        if filtros.segurado:
+            analise["status_atual"] = interpretar_status(" ".join(fonte.conteudos(filtros, n=3).astype(str)))
+        else:
+            # status já classificado na carga (coluna categórica)
+            status_series = (cubo if via_cubo else fonte).contagem_status(filtros).head(10)
+            analise["status"] = status_series.rename_axis("Status").reset_index(name="Ocorrências")
+            m["linhas"] = int(status_series.sum())
+    with medir("ultimas_interacoes") as m:
+        analise["ultimas"] = fonte.ultimas(filtros, n=50)
+        m["linhas"] = len(analise["ultimas"])
+    return analise
+
+def _graficos(analise):
+    with medir("graficos"):
+        analise["grafico_canal"] = gerar_bar_chart(analise["por_canal"], "Interações por canal")
+        analise["grafico_integracao"] = gerar_bar_chart(analise["por_integracao"], "Interações por integração")
+
+def _calcular_analise_cliente(segurado):
+    with medir("resumo_cliente") as m:
+        analise = resumo_segurados.agregados(tabela, segurado)
+        analise["status_atual"] = resumo_segurados.entrada(segurado)["status"]
+        analise["ultimas"] = resumo_segurados.ultimas(tabela, segurado, n=50)
+        m["linhas"] = analise["total"]
+    _graficos(analise)
+    return analise
+
+def _calcular_busca(filtros, texto):
+    # busca combinada com os filtros (posições do índice em memória, qualquer que seja a fonte)
+    with medir("busca") as m:
+        linhas, relevancia = indice_busca.buscar(texto, get_consulta(versao_atual, tabela).posicoes(filtros))
+        m["linhas"] = len(linhas)
+    por_segurado = contagem(tabela.coluna("segurado").iloc[linhas]).head(20)
+    resultado = tabela.view(["data_hora", "segurado", "canal", "conteudo", "tipo_evento", "integracao"], linhas[:100])
+    resultado.insert(0, "relevância", relevancia[:100].round(2))
+    return {
+        "total": len(linhas),
+        "por_segurado": por_segurado.rename_axis("Segurado").reset_index(name="Interações"),
+        "resultado": resultado,
+    }
+
+def _grafico_periodo(filtros, granularidade, analise):
+    rotulo = next(r for r, g in GRANULARIDADES.items() if g == granularidade).lower()
+    with medir(f"grafico_{granularidade}") as m:
+        if cubo.atende(filtros):
+            serie = cubo.por_periodo(filtros, granularidade)
+        else:
+            # período que não é de dias inteiros: só a série mensal, calculada pela fonte
+            serie, rotulo = analise["por_mes"], "mês"
+        m["linhas"] = len(serie)
+        return gerar_bar_chart(serie, f"Interações por {rotulo}", cronologico=True)
+
+@cronometrado("analise_filtrada (com cache)", linhas=lambda analise: analise["total"])
+def analise_filtrada(filtros):
+    # resultados prontos para exibir; repetir uma combinação de filtros não recalcula nada
+    return get_cache_analise().obter(versao_atual, (type(fonte).__name__, filtros), lambda: _calcular_analise(filtros))
 
 # --------------------------
 # A - Análise por filtros (correção: usa coluna datetime interna para filtrar)
@@ -216,7 +348,7 @@ if aba == "Análise por filtros":
     st.title("Análise de Interações com Segurados")
 
     # Lista de segurados única e ordenada para seleção pesquisável
-    segurados = sorted([s for s in tabela_full[col_seg].dropna().astype(str).unique()]) if col_seg else []
+    segurados = fonte.opcoes("segurado")
     segurados_options = ["Todos"] + segurados
 
     with st.expander("Filtros rápidos", expanded=True):
@@ -226,56 +358,66 @@ if aba == "Análise por filtros":
         with col2:
             integracao_filtro = st.text_input("Filtrar por integração (ex: RCV):").strip()
         with col3:
-            tipos = []
-            if col_tipo:
-                tipos = sorted(tabela_full[col_tipo].dropna().astype(str).unique().tolist())
+            tipos = fonte.opcoes("tipo_evento")
             tipo_filtro = st.selectbox("Filtrar por tipo de evento", options=["Todos"] + tipos)
         st.write("")  # espaçamento
         use_date_filter = st.checkbox("Ativar filtro por data", value=False)
-        min_date = pd.to_datetime(tabela_full[col_parsed], errors='coerce').min()
-        max_date = pd.to_datetime(tabela_full[col_parsed], errors='coerce').max()
+        # limites do seletor vêm do cubo (primeiro e último dia com interações)
+        min_date, max_date = cubo.intervalo_datas()
         if pd.isna(min_date):
-            min_date = date.today()
+            min_date = pd.Timestamp(date.today())
         if pd.isna(max_date):
-            max_date = date.today()
+            max_date = pd.Timestamp(date.today())
         if use_date_filter:
-            col4, col5 = st.columns([1, 1])
-            with col4:
-                periodo_de = st.date_input("Data inicial (a partir de)", value=min_date.date())
-            with col5:
-                periodo_ate = st.date_input("Data final (até)", value=max_date.date())
+            periodo = st.date_input("Período", value=(min_date.date(), max_date.date()),
+                                    min_value=min_date.date(), max_value=max_date.date(), format="DD/MM/YYYY")
+            # enquanto só a data inicial foi escolhida, o período vai até o fim
+            periodo_de = periodo[0] if len(periodo) > 0 else None
+            periodo_ate = periodo[1] if len(periodo) > 1 else None
+            if periodo_de is not None:
+                no_periodo = cubo.agregados(Filtros(inicio=pd.Timestamp(periodo_de),
+                                                    fim=pd.Timestamp(periodo_ate or max_date.date()) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)))["total"]
+                st.caption(f"{no_periodo} interação(ões) no período, antes dos demais filtros.")
         else:
             periodo_de = None
             periodo_ate = None
 
-    filtro = tabela_full.copy()
-
-    if cliente_filtro and cliente_filtro != "Todos" and col_seg:
-        filtro = filtro[filtro[col_seg].astype(str).str.lower() == cliente_filtro.lower()]
-    if integracao_filtro and col_integr:
-        filtro = filtro[filtro[col_integr].astype(str).str.lower() == integracao_filtro.lower()]
-    if tipo_filtro and tipo_filtro != "Todos" and col_tipo:
-        filtro = filtro[filtro[col_tipo].astype(str) == tipo_filtro]
+    busca_texto = st.text_input("🔎 Buscar no conteúdo (sem acento/maiúsculas; use * para prefixo, ex.: bolet*)").strip()
+
+    # filtros de data: fim inclusivo até o último segundo do dia
+    start_dt = pd.to_datetime(periodo_de) if periodo_de is not None else None
+    end_dt = pd.to_datetime(periodo_ate) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1) if periodo_ate is not None else None
+    filtros = Filtros(
+        segurado=cliente_filtro if cliente_filtro != "Todos" else None,
+        integracao=integracao_filtro or None,
+        tipo_evento=tipo_filtro if tipo_filtro != "Todos" else None,
+        inicio=start_dt,
+        fim=end_dt,
+    )
+    if busca_texto:
+        busca = get_cache_analise().obter(versao_atual, ("busca", filtros, busca_texto),
+                                          lambda: _calcular_busca(filtros, busca_texto))
+        st.subheader(f"Busca: “{busca_texto}”")
+        if busca["total"] == 0:
+            st.info("Nenhuma interação contém todos os termos buscados com esses filtros.")
+        else:
+            st.caption(f"{busca['total']} interação(ões) encontrada(s); mostrando as 100 mais relevantes.")
+            col_seg, col_res = st.columns([1, 3])
+            with col_seg:
+                st.dataframe(busca["por_segurado"], hide_index=True, use_container_width=True)
+            with col_res:
+                st.dataframe(busca["resultado"], hide_index=True, height=400)
 
-    # filtros de data: usar a coluna parsed interna (col_parsed)
-    if periodo_de is not None and col_parsed:
-        start_dt = pd.to_datetime(periodo_de)
-        filtro = filtro[pd.to_datetime(filtro[col_parsed], errors='coerce') >= start_dt]
-    if periodo_ate is not None and col_parsed:
-        end_dt = pd.to_datetime(periodo_ate) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-        filtro = filtro[pd.to_datetime(filtro[col_parsed], errors='coerce') <= end_dt]
+    agregados = analise_filtrada(filtros)
 
-    if filtro.empty:
+    if agregados["total"] == 0:
         st.warning("Nenhuma interação encontrada com esses filtros.")
     else:
-        total = len(filtro)
-        try:
-            primeira = pd.to_datetime(filtro[col_parsed], errors='coerce').min() if col_parsed else pd.NaT
-            ultima = pd.to_datetime(filtro[col_parsed], errors='coerce').max() if col_parsed else pd.NaT
-        except Exception:
-            primeira = ultima = pd.NaT
+        total = agregados["total"]
+        primeira = agregados["primeira"]
+        ultima = agregados["ultima"]
         dias_desde_primeira = (datetime.now() - primeira).days if pd.notna(primeira) else None
-        canal_mais_usado = filtro[col_canal].mode().iloc[0] if (col_canal and not filtro[col_canal].mode().empty) else "—"
+        canal_mais_usado = agregados["canal_mais_usado"]
 
         left, right = st.columns([2, 3])
         with left:
@@ -289,55 +431,28 @@ if aba == "Análise por filtros":
         with right:
             col_a, col_b = st.columns(2)
             with col_a:
-                if col_canal:
-                    cont_canal = filtro[col_canal].value_counts()
-                    st.altair_chart(gerar_bar_chart(cont_canal, "Interações por canal"), use_container_width=True)
+                st.altair_chart(agregados["grafico_canal"], use_container_width=True)
             with col_b:
-                if col_integr:
-                    cont_int = filtro[col_integr].value_counts()
-                    st.altair_chart(gerar_bar_chart(cont_int, "Interações por integração"), use_container_width=True)
+                st.altair_chart(agregados["grafico_integracao"], use_container_width=True)
 
         st.subheader("Status (interpretação automática)")
-        if col_parsed:
-            ultimas_three = filtro.assign(_parsed=pd.to_datetime(filtro[col_parsed], errors='coerce')).sort_values("_parsed", ascending=False).head(3)
+        if "status_atual" in agregados:
+            st.write(f"Status atual para **{cliente_filtro}**: ", agregados["status_atual"])
         else:
-            ultimas_three = filtro.head(3)
-        if cliente_filtro and cliente_filtro != "Todos" and not ultimas_three.empty and col_conteudo:
-            conteudos = " ".join(ultimas_three[col_conteudo].astype(str))
-            st.write(f"Status atual para **{cliente_filtro}**: ", interpretar_status(conteudos))
-        else:
-            if col_conteudo:
-                status_series = filtro[col_conteudo].apply(interpretar_status).value_counts().head(10)
-                st.table(status_series.rename_axis("Status").reset_index(name="Ocorrências"))
+            st.table(agregados["status"])
 
         st.subheader("Últimas interações")
-        display_cols = [c for c in [col_data_display, col_seg, col_canal, col_tipo, col_integr, col_conteudo] if c]
-        if col_parsed:
-            filtro_sorted = filtro.assign(_parsed=pd.to_datetime(filtro[col_parsed], errors='coerce')).sort_values("_parsed", ascending=False)
-            st.dataframe(filtro_sorted[display_cols].head(50), height=480)
-        else:
-            st.dataframe(filtro.sort_values(by=display_cols[0], ascending=False)[display_cols].head(50), height=480)
-
-        st.subheader("Interações por mês")
-        if col_parsed:
-            cont_mes = pd.to_datetime(filtro[col_parsed], errors='coerce').dt.to_period("M").value_counts().sort_index()
-            cont_mes.index = cont_mes.index.astype(str)
-            st.altair_chart(gerar_bar_chart(cont_mes, "Interações por mês"), use_container_width=True)
-
-        # prepara CSV padronizando colunas de saída quando possível
-        output_df = filtro.copy()
-        out_cols_map = {}
-        for logical, real_prefix in [("data_hora", "data_hora"), ("segurado", "segurado"), ("canal", "canal"),
-                                     ("conteudo", "conteudo"), ("tipo_evento", "tipo_evento"), ("integracao", "integracao")]:
-            real = find_col(real_prefix, tabela_full.columns)
-            if real and real in output_df.columns:
-                out_cols_map[real] = logical
-        if out_cols_map:
-            csv_df = output_df[list(out_cols_map.keys())].rename(columns=out_cols_map)
-        else:
-            csv_df = output_df
-        csv_bytes = baixar_csv_bytes(csv_df)
-        st.download_button("Download dos dados filtrados (CSV)", data=csv_bytes, file_name="interacoes_filtradas.csv", mime="text/csv")
+        st.dataframe(agregados["ultimas"], height=480)
+
+        st.subheader("Interações por período")
+        granularidade = GRANULARIDADES[st.radio("Agrupar por", list(GRANULARIDADES), horizontal=True)]
+        grafico = get_cache_analise().obter(versao_atual, ("periodo", filtros, granularidade),
+                                            lambda: _grafico_periodo(filtros, granularidade, agregados))
+        st.altair_chart(grafico, use_container_width=True)
+
+        # exportação com as colunas de saída padronizadas (data_hora formatada), gerada só quando pedida
+        secao_exportacao("filtrados", (type(fonte).__name__, filtros), lambda: fonte.exportar(filtros),
+                         "interacoes_filtradas", "dados filtrados")
 
 # --------------------------
 # B - Dados completos (ordenação/filtragem por datetime corrigida)
@@ -353,27 +468,42 @@ elif aba == "Dados completos":
 
     ordenar = st.selectbox("Ordenar por", options=["Nenhum"] + available_cols, index=0)
     asc = st.checkbox("Ordem crescente", value=False)
-    mostrar = st.number_input("Quantidade de linhas a mostrar", min_value=10, max_value=10000, value=200, step=10)
+    por_pagina = st.selectbox("Linhas por página", options=[50, 100, 200, 500, 1000], index=2)
 
     requested = cols
-    existing = [c for c in requested if c in tabela_full.columns]
-    missing_cols = [c for c in requested if c not in tabela_full.columns]
+    existing = [c for c in requested if c in available_cols]
+    missing_cols = [c for c in requested if c not in available_cols]
     if missing_cols:
         st.warning(f"As colunas a seguir não existem e foram ignoradas: {missing_cols}")
 
-    tabela_display = tabela_full.copy()
-    # se o usuário pedir para ordenar por data_hora, garantir que usamos a coluna parsed para ordenar
-    if ordenar != "Nenhum":
-        if ordenar.startswith("data_hora") and col_parsed:
-            tabela_display = tabela_display.assign(_parsed=pd.to_datetime(tabela_display[col_parsed], errors='coerce')).sort_values("_parsed", ascending=asc)
-        elif ordenar in tabela_display.columns:
-            tabela_display = tabela_display.sort_values(by=ordenar, ascending=asc)
+    # paginação: só a página visível é montada e enviada ao navegador; a permutação de
+    # ordenação fica em cache na tabela (por coluna e sentido) e é reaproveitada entre páginas
+    total_paginas = max(1, -(-len(tabela) // por_pagina))
+    if st.session_state.get("pagina_dados", 1) > total_paginas:
+        st.session_state["pagina_dados"] = total_paginas
+    pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, step=1, key="pagina_dados")
+    inicio = (pagina - 1) * por_pagina
+    if ordenar != "Nenhum" and ordenar in available_cols:
+        linhas = tabela.ordem(ordenar, crescente=asc)[inicio:inicio + por_pagina]
+    else:
+        linhas = slice(inicio, inicio + por_pagina)
 
     if not existing:
         st.info("Nenhuma coluna válida selecionada. Selecione colunas para visualizar a tabela.")
     else:
-        st.dataframe(tabela_display[existing].head(mostrar), height=640)
+        with medir("pagina_dados") as m:
+            pagina_df = tabela.view(existing, linhas)
+            m["linhas"] = len(pagina_df)
+        st.dataframe(pagina_df, height=640)
+        st.caption(f"Linhas {inicio + 1}–{min(inicio + por_pagina, len(tabela))} de {len(tabela)}")
 
-    download_cols = [c for c in ["data_hora", "segurado", "canal", "conteudo", "tipo_evento", "integracao"] if c in tabela_full.columns]
-    csv_bytes_all = baixar_csv_bytes(tabela_full[download_cols])
-    st.download_button("Download dados completos (CSV)", data=csv_bytes_all, file_name="dados_completos.csv", mime="text/csv")
+    secao_exportacao("completos", None, lambda: tabela.view(expected_cols), "dados_completos", "dados completos")
+
+    with st.expander("Relatório de memória"):
+        if st.button("Comparar com a representação anterior"):
+            st.table(relatorio_memoria(df, tabela))
+
+# --------------------------
+# Tempos desta execução (debug)
+# --------------------------
+mostrar_tempos()
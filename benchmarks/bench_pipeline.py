@@ -0,0 +1,200 @@
+"""Benchmark do pipeline do painel: tempo e pico de memória por etapa, em planilhas sintéticas.
+
+Uso:
+    python benchmarks/bench_pipeline.py --linhas 1000 10000 100000 1000000 --saida resultado.json
+    python benchmarks/bench_pipeline.py --linhas 100000 --comparar resultado_anterior.json
+
+A etapa "carga" usa o backend falso do Google Sheets (planilha_fake) e precisa do gspread
+instalado; as demais usam só pandas. O JSON guarda o commit atual para comparar execuções.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from busca import IndiceBusca
+from consultas import ConsultaTabela, Filtros
+from cubo import CuboInteracoes
+from datas import parse_date_series, parse_date_value
+from exportacao import gerar_exportacao
+from segurados import ResumoSegurados
+from sinteticos import gerar_df, gerar_linhas
+from status import classificar_serie, interpretar_status
+from tabela import TabelaInteracoes, representacao_legada
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def medir(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes e mais uma com tracemalloc (pico de memória).
+
+    Guarda o tempo da primeira execução (fria: colunas derivadas e ordenações ainda não
+    calculadas) e o melhor tempo entre as repetições.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, {"segundos": min(tempos), "primeira_segundos": tempos[0], "pico_mb": pico / 2 ** 20}
+
+def etapa_carga(n):
+    # leitura completa via CargaPlanilha + AcessoPlanilha sobre o backend falso (sem rede)
+    from carga import CargaPlanilha
+    from planilha import SHEET_ID, AcessoPlanilha
+    from planilha_fake import ClienteFake
+    linhas = gerar_linhas(n)
+
+    def carregar():
+        acesso = AcessoPlanilha(ClienteFake({SHEET_ID: {"Página1": linhas}}).fabrica)
+        return CargaPlanilha(lambda: acesso).carregar()
+    return carregar
+
+def etapa_carga_fragmentada(n, fontes=4, latencia=0.05):
+    # o mesmo volume dividido em várias abas, lidas em paralelo por CargaFragmentada
+    from carga import CargaFragmentada
+    from planilha import SHEET_ID, AcessoPlanilha, Fonte
+    from planilha_fake import ClienteFake
+    abas = {f"aba{i}": gerar_linhas(n // fontes, seed=i) for i in range(fontes)}
+    lista = [Fonte(aba, SHEET_ID, aba, ativa=(i == fontes - 1)) for i, aba in enumerate(abas)]
+
+    def carregar():
+        acesso = AcessoPlanilha(ClienteFake({SHEET_ID: abas}, latencia=latencia).fabrica)
+        return CargaFragmentada(lambda: acesso, lista).carregar()
+    return carregar
+
+def rodar(n, repeticoes, max_legado, max_carga):
+    resultados = {}
+
+    def registrar(nome, funcao):
+        valor, medida = medir(funcao, repeticoes)
+        resultados[nome] = medida
+        print(f"  {nome:<22} {medida['segundos'] * 1000:10.1f} ms  (1ª {medida['primeira_segundos'] * 1000:10.1f} ms)"
+              f"  {medida['pico_mb']:9.1f} MB", flush=True)
+        return valor
+
+    if n <= max_carga:
+        try:
+            registrar("carga", etapa_carga(n))
+            registrar("carga_fragmentada", etapa_carga_fragmentada(n))
+        except ImportError as e:
+            resultados["carga"] = {"pulada": f"dependência ausente: {e.name}"}
+            print(f"  {'carga':<22} pulada ({e.name} não instalado)")
+
+    df = gerar_df(n)
+    if n <= max_legado:
+        registrar("datas_legado", lambda: df["data_hora"].apply(parse_date_value))
+    registrar("datas", lambda: parse_date_series(df["data_hora"]))
+    if n <= max_legado:
+        registrar("copias_legado", lambda: representacao_legada(df))
+    tabela = registrar("tabela", lambda: TabelaInteracoes(df))
+    consulta = registrar("indice_filtros", lambda: ConsultaTabela(tabela))
+
+    segurado = consulta.opcoes("segurado")[0]
+    inicio, fim = consulta.intervalo_datas()
+    meio = inicio + (fim - inicio) / 2
+    filtros = {
+        "filtro_segurado": Filtros(segurado=segurado),
+        "filtro_integracao": Filtros(integracao="RCV"),
+        "filtro_tipo_evento": Filtros(tipo_evento="Retorno"),
+        "filtro_periodo": Filtros(inicio=meio, fim=fim),
+        "filtro_combinado": Filtros(segurado=segurado, integracao="RCV", inicio=inicio, fim=meio),
+    }
+    for nome, f in filtros.items():
+        registrar(nome, lambda f=f: consulta.posicoes(f))
+
+    def montar_resumo():
+        return ResumoSegurados().atualizar(tabela, 1)
+    resumo = registrar("resumo_segurados", montar_resumo)
+    registrar("cliente_via_resumo", lambda: (resumo.agregados(tabela, segurado), resumo.ultimas(tabela, segurado)))
+    def montar_busca():
+        return IndiceBusca().atualizar(tabela, 1)
+    indice_busca = registrar("indice_busca", montar_busca)
+    registrar("busca_termo", lambda: indice_busca.buscar("integração"))
+    registrar("busca_filtrada", lambda: indice_busca.buscar("reuni* alinhamento", consulta.posicoes(filtros["filtro_combinado"])))
+    registrar("agregados_todos", lambda: consulta.agregados(Filtros()))
+    registrar("agregados_segurado", lambda: consulta.agregados(filtros["filtro_segurado"]))
+    def montar_cubo():
+        return CuboInteracoes().atualizar(tabela, 1)
+    cubo = registrar("cubo", montar_cubo)
+    dia_inicio, dia_fim = cubo.intervalo_datas()
+    periodo_dias = Filtros(integracao="RCV", inicio=dia_inicio, fim=dia_fim - pd.Timedelta(days=30))
+    registrar("agregados_cubo", lambda: (cubo.agregados(Filtros()), cubo.contagem_status(Filtros())))
+    registrar("agregados_cubo_periodo", lambda: cubo.agregados(periodo_dias))
+    registrar("cubo_por_semana", lambda: cubo.por_periodo(periodo_dias, "semana"))
+    registrar("ultimas_50", lambda: consulta.ultimas(Filtros(), n=50))
+    registrar("status_serie", lambda: classificar_serie(tabela.coluna("conteudo")))
+    registrar("interpretar_status", lambda: [interpretar_status(t) for t in consulta.conteudos(filtros["filtro_segurado"], n=3)])
+    registrar("exportacao_csv", lambda: gerar_exportacao(consulta.exportar(Filtros()), "CSV"))
+    return resultados
+
+def commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def comparar(atual, anterior):
+    print(f"\ncomparação com {anterior.get('commit')} (tempo atual / anterior):")
+    for n, etapas in atual["resultados"].items():
+        base = anterior["resultados"].get(n, {})
+        for nome, medida in etapas.items():
+            ref = base.get(nome, {})
+            if "segundos" in medida and ref.get("segundos"):
+                razao = medida["segundos"] / ref["segundos"]
+                alerta = "  <-- mais lento" if razao > 1.2 else ""
+                print(f"  {n:>8} {nome:<22} {razao:6.2f}x{alerta}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções medidas por etapa (mínimo 1)")
+    parser.add_argument("--max-legado", type=int, default=200000,
+                        help="maior tamanho em que as versões legadas (apply por célula, cópias) são medidas")
+    parser.add_argument("--max-carga", type=int, default=200000,
+                        help="maior tamanho em que a carga pelo backend falso é medida")
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+    args.repeticoes = max(1, args.repeticoes)
+
+    saida = {
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "repeticoes": args.repeticoes,
+        "resultados": {},
+    }
+    for n in args.linhas:
+        print(f"{n} linhas:")
+        saida["resultados"][str(n)] = rodar(n, args.repeticoes, args.max_legado, args.max_carga)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(saida, f, indent=2, ensure_ascii=False)
+        print(f"\nresultados gravados em {args.saida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(saida, json.load(f))
+
+if __name__ == "__main__":
+    main()
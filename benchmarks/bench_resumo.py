@@ -0,0 +1,99 @@
+"""Benchmark do resumo de e-mails: e-mails por segundo antes (loop por bloco) e depois (lote).
+
+Uso:
+    python benchmarks/bench_resumo.py --n 40 --batch-size 8 --threads 4
+    python benchmarks/bench_resumo.py --eml-dir caminho/com/emls
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from email import policy
+from email.parser import BytesParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resumo import (BACKENDS, MAX_CHARS, carregar_summarizer, configurar_threads, dividir_blocos, normalizar,
+                    resumo_por_atalho, resumir_lote, RESUMO_VAZIO)
+
+FRASES = [
+    "Segue em anexo a documentação solicitada para a integração do sistema.",
+    "O segurado informou que o boleto foi pago na data de vencimento.",
+    "Estamos analisando o retorno enviado pela equipe técnica.",
+    "Por favor, verifique os dados cadastrais antes de prosseguir com o processo.",
+    "A apólice foi renovada e os novos valores já constam no portal.",
+    "Encaminho abaixo o histórico das mensagens trocadas com o cliente.",
+]
+FRASES_ATALHO = [
+    "Gostaria de saber sua disponibilidade para uma reunião na próxima semana.",
+    "Ficou alguma dúvida sobre o processo?",
+]
+
+def corpos_sinteticos(n, seed=0):
+    rnd = random.Random(seed)
+    corpos = []
+    for _ in range(n):
+        frases = [rnd.choice(FRASES) for _ in range(rnd.randint(3, 40))]
+        if rnd.random() < 0.3:
+            frases.append(rnd.choice(FRASES_ATALHO))
+        corpos.append(" ".join(frases))
+    return corpos
+
+def corpos_de_diretorio(pasta):
+    corpos = []
+    for nome in sorted(os.listdir(pasta)):
+        if nome.lower().endswith(".eml"):
+            with open(os.path.join(pasta, nome), "rb") as f:
+                msg = BytesParser(policy=policy.default).parse(f)
+            parte = msg.get_body(preferencelist=("plain",))
+            corpos.append(parte.get_content() if parte else "")
+    return corpos
+
+def resumir_legado(body, summarizer):
+    # implementação anterior: um e-mail e um bloco por chamada, atalhos só no fim
+    texto = body.strip()
+    if len(texto) == 0:
+        return RESUMO_VAZIO
+    texto = normalizar(texto)
+    resumos = []
+    for b in dividir_blocos(texto, MAX_CHARS):
+        try:
+            out = summarizer(b, max_length=40, min_length=15, do_sample=False)
+            resumos.append(out[0]["summary_text"])
+        except Exception:
+            resumos.append(b[:150] + ("..." if len(b) > 150 else ""))
+    return resumo_por_atalho(texto) or " ".join(resumos)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=40, help="quantidade de e-mails sintéticos")
+    parser.add_argument("--eml-dir", help="usa os .eml deste diretório em vez de e-mails sintéticos")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=0, help="torch.set_num_threads (0 = padrão)")
+    parser.add_argument("--backend", default="torch", choices=BACKENDS)
+    args = parser.parse_args()
+
+    corpos = corpos_de_diretorio(args.eml_dir) if args.eml_dir else corpos_sinteticos(args.n)
+    configurar_threads(args.threads)
+    t0 = time.perf_counter()
+    summarizer = carregar_summarizer(backend=args.backend)
+    carga = time.perf_counter() - t0
+    summarizer("aquecimento do modelo " * 20, max_length=40, min_length=15, do_sample=False)
+
+    t0 = time.perf_counter()
+    for body in corpos:
+        resumir_legado(body, summarizer)
+    antes = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    resumir_lote(corpos, lambda: summarizer, batch_size=args.batch_size)
+    depois = time.perf_counter() - t0
+
+    print(f"e-mails: {len(corpos)}  batch_size: {args.batch_size}  threads: {args.threads or 'padrão'}  backend: {args.backend}")
+    print(f"carga do modelo: {carga:.1f}s")
+    print(f"antes : {len(corpos) / antes:8.2f} e-mails/s ({antes:.1f}s)")
+    print(f"depois: {len(corpos) / depois:8.2f} e-mails/s ({depois:.1f}s)")
+
+if __name__ == "__main__":
+    main()
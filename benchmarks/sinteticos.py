@@ -0,0 +1,64 @@
+"""Planilhas sintéticas no formato da planilha de interações (as seis colunas esperadas).
+
+data_hora mistura seriais do Excel (float, inteiro quando só há data e texto com vírgula
+decimal), textos dd/mm/aaaa com e sem hora, e alguns vazios/inválidos, como acontece na
+planilha real.
+"""
+import numpy as np
+import pandas as pd
+
+COLUNAS = ["segurado", "canal", "data_hora", "conteudo", "tipo_evento", "integracao"]
+CANAIS = ["E-mail", "Telefone", "WhatsApp", "Reunião", "Portal"]
+TIPOS_EVENTO = ["Outros", "Inicio", "Cobrança", "Retorno", "Questionamento"]
+INTEGRACOES = ["RCV", "APP", "OUTRO"]
+CONTEUDOS = [
+    "Enviado e-mail solicitando disponibilidade de horários para agendar reunião inicial.",
+    "Segurado informou que a integração foi concluída e está em produção.",
+    "Aguardando retorno do cliente sobre a documentação pendente.",
+    "Reunião de alinhamento realizada; próximos passos definidos.",
+    "Cobrança enviada, sem resposta até o momento.",
+    "Não tem interesse em seguir com a integração neste momento.",
+    "Dúvida sobre o layout do arquivo de retorno esclarecida por telefone.",
+    "Teste de integração com erro no envio, aguardando correção.",
+]
+
+def gerar_df(n, seed=0, n_segurados=None):
+    """DataFrame com `n` linhas no formato de get_all_records."""
+    rnd = np.random.default_rng(seed)
+    n_segurados = n_segurados or max(10, n // 50)
+    segurados = np.array([f"Segurado {i:05d} Ltda" for i in range(n_segurados)], dtype=object)
+
+    # datas entre 2022 e 2025, como serial do Excel (dias desde 1899-12-30)
+    seriais = rnd.uniform(44562, 46022, n).round(6)
+    datas = pd.to_datetime(seriais, unit="D", origin="1899-12-30")
+    tipo = rnd.random(n)
+    data_hora = np.empty(n, dtype=object)
+    serial = tipo < 0.35
+    serial_inteiro = (tipo >= 0.35) & (tipo < 0.4)
+    serial_virgula = (tipo >= 0.4) & (tipo < 0.45)
+    com_hora = (tipo >= 0.45) & (tipo < 0.8)
+    so_data = (tipo >= 0.8) & (tipo < 0.97)
+    data_hora[serial] = seriais[serial]
+    # serial só com a data (número inteiro) e serial em texto com vírgula decimal
+    data_hora[serial_inteiro] = np.floor(seriais[serial_inteiro]).astype(np.int64).astype(object)
+    data_hora[serial_virgula] = np.char.replace(seriais[serial_virgula].astype(str), ".", ",").astype(object)
+    data_hora[com_hora] = datas[com_hora].strftime("%d/%m/%Y %H:%M")
+    data_hora[so_data] = datas[so_data].strftime("%d/%m/%Y")
+    data_hora[tipo >= 0.97] = rnd.choice(["", "sem data", "31/02/2024"], int((tipo >= 0.97).sum()))
+
+    conteudo = np.array(CONTEUDOS, dtype=object)[rnd.integers(0, len(CONTEUDOS), n)]
+    # sufixo para que os conteúdos não sejam todos idênticos
+    conteudo = conteudo + " Ref. " + rnd.integers(0, 10 ** 6, n).astype(str).astype(object)
+    return pd.DataFrame({
+        "segurado": segurados[rnd.integers(0, n_segurados, n)],
+        "canal": np.array(CANAIS, dtype=object)[rnd.integers(0, len(CANAIS), n)],
+        "data_hora": data_hora,
+        "conteudo": conteudo,
+        "tipo_evento": np.array(TIPOS_EVENTO, dtype=object)[rnd.integers(0, len(TIPOS_EVENTO), n)],
+        "integracao": np.array(INTEGRACOES, dtype=object)[rnd.integers(0, len(INTEGRACOES), n)],
+    }, columns=COLUNAS)
+
+def gerar_linhas(n, seed=0):
+    """Mesmos dados como linhas da planilha (cabeçalho + valores em texto), para o backend falso."""
+    df = gerar_df(n, seed)
+    return [COLUNAS] + df.astype(str).values.tolist()
@@ -0,0 +1,198 @@
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# --------------------------
+# Busca textual no conteúdo (índice invertido em memória)
+# --------------------------
+# Tokens em minúsculas, sem acento (NFKD) e sem stopwords do português. Cada segmento do
+# índice guarda, por termo, as posições das linhas que o contêm (em ordem crescente) e a
+# frequência do termo na linha; a relevância é BM25. Quando a planilha só ganha linhas no fim,
+# essas linhas viram um segmento novo (sem refazer o resto); segmentos pequenos são fundidos
+# de tempos em tempos. Cada versão dos dados tem o seu índice (um objeto novo que reaproveita
+# os segmentos do anterior), que não muda depois de pronto. Além do conteúdo, colunas de
+# assunto do e-mail ("assunto"/"subject"), se existirem na planilha, também são indexadas.
+
+STOPWORDS = frozenset("""
+a ao aos as ate com como da das de dele dela deles delas do dos e ela elas ele eles em entre
+era essa essas esse esses esta estas este estes eu foi ha isso isto ja lhe mais mas me mesmo
+meu minha muito na nao nas nem no nos nossa nosso num numa o os ou para pela pelas pelo pelos
+por qual quando que quem se sem ser seu seus so sua suas tambem te tem um uma uns umas voce
+""".split())
+
+COLUNAS_ASSUNTO = ("assunto", "subject")
+MAX_SEGMENTOS = 8
+K1, B = 1.2, 0.75
+
+_SEPARADOR = re.compile(r"[^0-9a-z]+")
+
+def tokenizar(texto):
+    """Tokens de um texto: minúsculas, sem acento, sem pontuação e sem stopwords."""
+    t = unicodedata.normalize("NFKD", str(texto).lower()).encode("ascii", "ignore").decode()
+    return [p for p in _SEPARADOR.split(t) if len(p) > 1 and p not in STOPWORDS]
+
+def _termos_consulta(consulta):
+    # "bolet*" busca pelo prefixo; os demais termos precisam aparecer inteiros
+    termos = []
+    for parte in str(consulta).split():
+        prefixo = parte.endswith("*")
+        for token in tokenizar(parte):
+            termos.append((token, prefixo))
+    return termos
+
+def _arrow(serie):
+    arr = pa.array(serie.astype(str).astype("string[pyarrow]"))
+    return arr.combine_chunks() if isinstance(arr, pa.ChunkedArray) else arr
+
+def _textos(tabela, inicio):
+    textos = _arrow(tabela.coluna("conteudo").iloc[inicio:])
+    assuntos = [c for c in tabela.frame.columns if str(c).strip().lower() in COLUNAS_ASSUNTO]
+    for coluna in assuntos:
+        textos = pc.binary_join_element_wise(textos, _arrow(tabela.frame[coluna].iloc[inicio:]), pa.scalar(" ", textos.type))
+    return textos
+
+def _montar_segmento(textos, inicio):
+    """Índice invertido das linhas `inicio .. inicio+len(textos)-1`."""
+    n = len(textos)
+    # separa por espaço no Arrow e normaliza só o vocabulário distinto (bem menor que o texto)
+    palavras = pc.utf8_split_whitespace(pc.utf8_lower(pc.fill_null(textos, "")))
+    linhas = pc.list_parent_indices(palavras).to_numpy()
+    codificadas = pc.dictionary_encode(pc.list_flatten(palavras))
+    indices = codificadas.indices.to_numpy(zero_copy_only=False)
+    tokens_por_palavra = [tokenizar(p) for p in codificadas.dictionary.to_pylist()]
+    vocab = {}
+    codigos = np.array([vocab.setdefault(t, len(vocab)) for toks in tokens_por_palavra for t in toks], dtype=np.int64)
+    tamanhos = np.array([len(toks) for toks in tokens_por_palavra], dtype=np.int64)
+    inicios_palavra = np.concatenate([[0], np.cumsum(tamanhos)[:-1]]) if len(tamanhos) else tamanhos
+
+    # cada ocorrência de palavra vira 0..k tokens (ex.: "e-mail" -> "mail")
+    repeticoes = tamanhos[indices] if len(indices) else np.empty(0, dtype=np.int64)
+    total = int(repeticoes.sum())
+    linha_token = np.repeat(linhas, repeticoes)
+    deslocamento = np.arange(total) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+    codigo_token = codigos[np.repeat(inicios_palavra[indices], repeticoes) + deslocamento] if total else codigos[:0]
+
+    comprimentos = np.bincount(linha_token, minlength=n).astype(np.int32)
+    chaves, tf = np.unique(codigo_token * max(n, 1) + linha_token, return_counts=True)
+    codigo_posting = chaves // max(n, 1)
+    inicios = np.zeros(len(vocab) + 1, dtype=np.int64)
+    inicios[1:] = np.cumsum(np.bincount(codigo_posting, minlength=len(vocab)))
+    termos = sorted(vocab)
+    return {
+        "inicio": inicio,
+        "vocab": vocab,
+        "termos": termos,
+        "linhas": (chaves % max(n, 1) + inicio).astype(np.int64),
+        "tf": tf.astype(np.int32),
+        "inicios": inicios,
+        "comprimentos": comprimentos,
+    }
+
+def _postings(segmento, termo, prefixo):
+    vocab = segmento["vocab"]
+    if not prefixo:
+        codigo = vocab.get(termo)
+        codigos = [] if codigo is None else [codigo]
+    else:
+        termos = segmento["termos"]
+        i = bisect_left(termos, termo)
+        codigos = []
+        while i < len(termos) and termos[i].startswith(termo):
+            codigos.append(vocab[termos[i]])
+            i += 1
+    partes = [(segmento["linhas"][segmento["inicios"][c]:segmento["inicios"][c + 1]],
+               segmento["tf"][segmento["inicios"][c]:segmento["inicios"][c + 1]]) for c in codigos]
+    if len(partes) <= 1:
+        return partes[0] if partes else (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32))
+    # vários termos com o mesmo prefixo: soma as frequências por linha
+    linhas, inverso = np.unique(np.concatenate([p[0] for p in partes]), return_inverse=True)
+    return linhas, np.bincount(inverso, weights=np.concatenate([p[1] for p in partes])).astype(np.int32)
+
+class IndiceBusca:
+    def __init__(self):
+        self.versao = None
+        self.linhas = 0
+        # (segmentos, comprimentos por linha), sempre trocados juntos em uma única atribuição
+        self.estado = ([], np.empty(0, dtype=np.int32))
+
+    def atualizar(self, tabela, versao, delta=None):
+        """Índice da versão `versao`, em um objeto novo (este não é alterado); com
+        delta=(versão anterior, linhas anteriores) igual ao deste índice, indexa só as linhas novas."""
+        if versao == self.versao:
+            return self
+        novo = IndiceBusca()
+        if delta is not None and tuple(delta) == (self.versao, self.linhas) and len(tabela) >= self.linhas:
+            novo.estado = self.estado
+            if len(tabela) > self.linhas:
+                novo._acrescentar(_montar_segmento(_textos(tabela, self.linhas), self.linhas))
+            segmentos, comprimentos = novo.estado
+            if len(segmentos) > MAX_SEGMENTOS:
+                # funde os segmentos incrementais (pequenos) em um só
+                inicio = segmentos[1]["inicio"]
+                novo.estado = (segmentos[:1], comprimentos[:inicio])
+                novo._acrescentar(_montar_segmento(_textos(tabela, inicio), inicio))
+        else:
+            novo._acrescentar(_montar_segmento(_textos(tabela, 0), 0))
+        novo.versao, novo.linhas = versao, len(tabela)
+        return novo
+
+    def _acrescentar(self, segmento):
+        # lista e array novos (não alterados no lugar): o índice anterior segue intacto
+        segmentos, comprimentos = self.estado
+        self.estado = (segmentos + [segmento], np.concatenate([comprimentos, segmento["comprimentos"]]))
+
+    def _termo(self, segmentos, termo, prefixo):
+        partes = [_postings(s, termo, prefixo) for s in segmentos]
+        return (np.concatenate([p[0] for p in partes]) if partes else np.empty(0, dtype=np.int64),
+                np.concatenate([p[1] for p in partes]) if partes else np.empty(0, dtype=np.int32))
+
+    def buscar(self, consulta, posicoes=None, limite=None):
+        """Linhas que contêm todos os termos da consulta, da mais relevante para a menos relevante.
+
+        posicoes: restringe às linhas já selecionadas pelos filtros (None = todas).
+        Retorna (posições, relevância) como arrays numpy.
+        """
+        termos = _termos_consulta(consulta)
+        segmentos, comprimentos = self.estado
+        vazio = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        if not termos or not segmentos:
+            return vazio
+        n = len(comprimentos)
+        media = max(float(comprimentos.mean()), 1.0) if n else 1.0
+        listas = []
+        for termo, prefixo in termos:
+            linhas, tf = self._termo(segmentos, termo, prefixo)
+            if len(linhas) == 0:
+                return vazio
+            idf = math.log(1 + (n - len(linhas) + 0.5) / (len(linhas) + 0.5))
+            listas.append((linhas, tf, idf))
+        listas.sort(key=lambda l: len(l[0]))
+
+        linhas = listas[0][0]
+        if posicoes is not None:
+            selecionadas = np.zeros(n, dtype=bool)
+            selecionadas[np.asarray(posicoes, dtype=np.int64)] = True
+            linhas = linhas[selecionadas[linhas]]
+        for outra, _, _ in listas[1:]:
+            if len(linhas) == 0:
+                break
+            linhas = np.intersect1d(linhas, outra, assume_unique=True)
+        if len(linhas) == 0:
+            return vazio
+
+        norma = K1 * (1 - B + B * comprimentos[linhas] / media)
+        relevancia = np.zeros(len(linhas))
+        for lista, tf, idf in listas:
+            freq = tf[np.searchsorted(lista, linhas)].astype(np.float64)
+            relevancia += idf * freq * (K1 + 1) / (freq + norma)
+
+        if limite is not None and len(linhas) > limite:
+            topo = np.argpartition(-relevancia, limite - 1)[:limite]
+            linhas, relevancia = linhas[topo], relevancia[topo]
+        # mais relevante primeiro; empate: a linha mais recente na planilha
+        ordem = np.lexsort((-linhas, -relevancia))
+        return linhas[ordem], relevancia[ordem]
@@ -0,0 +1,80 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# -------------------------
+# Cache persistente de resumos (SQLite)
+# -------------------------
+# A chave é o hash do corpo normalizado + nome do modelo; o arquivo sobrevive a reinícios
+# do app. Ao passar de `max_entradas`, as entradas usadas há mais tempo são removidas (LRU).
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "resumos.sqlite")
+MAX_ENTRADAS_PADRAO = 20000
+
+def chave_resumo(texto_normalizado, modelo):
+    return hashlib.sha256(f"{modelo}\0{texto_normalizado}".encode("utf-8")).hexdigest()
+
+class CacheResumos:
+    def __init__(self, caminho=CAMINHO_PADRAO, max_entradas=MAX_ENTRADAS_PADRAO):
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self.max_entradas = max_entradas
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS resumos (chave TEXT PRIMARY KEY, resumo TEXT NOT NULL, usado_em REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_resumos_usado_em ON resumos (usado_em)")
+        self._conn.commit()
+
+    def buscar_varios(self, chaves):
+        """Retorna {chave: resumo} para as chaves encontradas e atualiza o uso delas."""
+        if not chaves:
+            return {}
+        encontrados = {}
+        with self._lock:
+            unicas = list(dict.fromkeys(chaves))
+            for i in range(0, len(unicas), 500):
+                parte = unicas[i:i + 500]
+                marcadores = ",".join("?" * len(parte))
+                for chave, resumo in self._conn.execute(
+                        f"SELECT chave, resumo FROM resumos WHERE chave IN ({marcadores})", parte):
+                    encontrados[chave] = resumo
+            if encontrados:
+                agora = time.time()
+                self._conn.executemany("UPDATE resumos SET usado_em = ? WHERE chave = ?",
+                                       [(agora, c) for c in encontrados])
+                self._conn.commit()
+            acertos = sum(1 for c in chaves if c in encontrados)
+            self.acertos += acertos
+            self.falhas += len(chaves) - acertos
+        return encontrados
+
+    def gravar_varios(self, itens):
+        """Grava {chave: resumo} e remove as entradas menos usadas acima do limite."""
+        if not itens:
+            return
+        with self._lock:
+            agora = time.time()
+            self._conn.executemany("INSERT OR REPLACE INTO resumos (chave, resumo, usado_em) VALUES (?, ?, ?)",
+                                   [(c, r, agora) for c, r in itens.items()])
+            excesso = self._conn.execute("SELECT COUNT(*) FROM resumos").fetchone()[0] - self.max_entradas
+            if excesso > 0:
+                self._conn.execute(
+                    "DELETE FROM resumos WHERE chave IN (SELECT chave FROM resumos ORDER BY usado_em LIMIT ?)",
+                    (excesso,))
+            self._conn.commit()
+
+    def tamanho(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM resumos").fetchone()[0]
+
+    def limpar(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM resumos")
+            self._conn.commit()
+            self.acertos = self.falhas = 0
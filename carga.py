@@ -0,0 +1,239 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import gspread
+import pandas as pd
+from planilha import SHEET_ID
+
+# --------------------------
+# Carga da planilha com cache incremental
+# --------------------------
+# Guarda o DataFrame lido, o cabeçalho, o nº de linhas já lidas, o momento da última leitura
+# e a versão dos dados (incrementa sempre que os dados mudam). Não depende do Streamlit:
+# o painel guarda uma instância por processo e os benchmarks usam outra com o backend falso.
+# Com o log dividido em várias planilhas/abas, CargaFragmentada junta uma CargaPlanilha por fonte.
+
+COLUNA_FONTE = "fonte"
+
+def _buscar_linhas_novas(acesso, colunas, linhas_lidas, **local):
+    # linha 1 é o cabeçalho, então os registros já lidos ocupam as linhas 2..linhas_lidas+1
+    inicio = linhas_lidas + 2
+    ultima_col = gspread.utils.rowcol_to_a1(1, len(colunas)).rstrip("0123456789")
+    valores = acesso.executar("get_values", f"A{inicio}:{ultima_col}", **local)
+    registros = []
+    for linha in valores:
+        linha = (list(linha) + [""] * len(colunas))[:len(colunas)]
+        # mesma conversão numérica feita por get_all_records
+        registros.append(gspread.utils.numericise_all(linha))
+    return pd.DataFrame(registros, columns=colunas)
+
+def _sem_aviso(mensagem):
+    pass
+
+def _sincronizar_espelho(espelho, df, inicio, avisar):
+    # df: tabela inteira; as linhas a partir de `inicio` são as novas. Só acrescenta quando o
+    # espelho tem exatamente as anteriores: depois de uma sincronização que falhou, regrava tudo
+    if espelho is None or df.empty:
+        return
+    try:
+        if inicio and espelho.tamanho() == inicio:
+            espelho.sincronizar(df.iloc[inicio:], completa=False, inicio=inicio)
+        else:
+            espelho.sincronizar(df, completa=True)
+    except Exception:
+        avisar("⚠️ Não foi possível atualizar o espelho local; o painel segue com os dados da planilha.")
+
+class CargaPlanilha:
+    def __init__(self, get_acesso, espelho=None, ttl=300.0, somente_local=False, planilha=SHEET_ID, aba=None):
+        """get_acesso: função que devolve o AcessoPlanilha; espelho: EspelhoLocal opcional;
+        planilha/aba: de onde ler (aba None = primeira)."""
+        self.get_acesso = get_acesso
+        self.local = {"planilha": planilha, "aba": aba}
+        self.espelho = espelho
+        self.ttl = ttl
+        self.somente_local = somente_local
+        self.df = None
+        self.cabecalho = None
+        self.linhas = 0
+        self.lido_em = 0.0
+        self.versao = 0
+        # (versão anterior, linhas anteriores) quando a última mudança só acrescentou linhas no fim
+        self.delta = None
+        self.expirado = False  # linhas gravadas desde a última leitura: relê mesmo dentro do TTL
+        self.lock = threading.Lock()
+
+    def _guardar(self, df, cabecalho, delta=None):
+        self.delta = delta
+        self.df, self.cabecalho, self.linhas, self.lido_em = df, cabecalho, len(df), time.time()
+        self.expirado = False
+        return df
+
+    def carregar(self, forcar=False, avisar=_sem_aviso):
+        """Retorna os dados da planilha usando o cache.
+
+        Dentro do TTL devolve o DataFrame em cache sem chamar a API. Depois do TTL busca
+        apenas as linhas acrescentadas desde a última leitura. `forcar=True` (ou cache vazio
+        / cabeçalho alterado) refaz a leitura completa. Se a API falhar e houver espelho,
+        segue com ele (avisando via `avisar`); sem espelho a exceção é propagada.
+
+        Retorna (df, versão, delta) lidos juntos, sob o lock: outra sessão pode recarregar os
+        dados logo depois, então quem usa a versão ou o delta deve usar os desta chamada.
+        """
+        with self.lock:
+            self._ler(forcar, avisar)
+            return self.df, self.versao, self.delta
+
+    def _ler(self, forcar, avisar):
+        if not forcar and self.atual():
+            return self.df
+        if self.somente_local and self.espelho is not None:
+            self.versao += 1
+            return self._guardar(self.espelho.carregar(), None)
+        try:
+            acesso = self.get_acesso()
+            cabecalho = acesso.executar("row_values", 1, **self.local)
+            if forcar or self.df is None or len(self.df.columns) == 0 or cabecalho != self.cabecalho:
+                df = pd.DataFrame(acesso.executar("get_all_records", **self.local))
+                self.versao += 1
+                _sincronizar_espelho(self.espelho, df, 0, avisar)
+            else:
+                novos = _buscar_linhas_novas(acesso, list(self.df.columns), self.linhas, **self.local)
+                if novos.empty:
+                    return self._guardar(self.df, cabecalho, self.delta)
+                df = pd.concat([self.df, novos], ignore_index=True)
+                delta = (self.versao, self.linhas)
+                self.versao += 1
+                _sincronizar_espelho(self.espelho, df, self.linhas, avisar)
+                return self._guardar(df, cabecalho, delta)
+        except Exception:
+            if self.espelho is not None and self.espelho.tamanho() > 0:
+                # API indisponível: segue offline com o espelho local (cabeçalho None força leitura completa depois)
+                avisar("⚠️ Planilha indisponível; exibindo dados do espelho local.")
+                self.versao += 1
+                return self._guardar(self.espelho.carregar(), None)
+            raise
+        return self._guardar(df, cabecalho)
+
+    def invalidar(self):
+        # força leitura completa na próxima chamada de carregar
+        with self.lock:
+            self.df = None
+
+    def atual(self):
+        # True quando carregar() devolveria o cache sem chamar a API
+        return self.df is not None and not self.expirado and time.time() - self.lido_em < self.ttl
+
+    def marcar_escrita(self, fonte=None):
+        # linhas gravadas na planilha (fila de escrita): a próxima chamada busca as novas, sem esperar o TTL
+        self.expirado = True
+
+class CargaFragmentada:
+    """Mesma interface de CargaPlanilha para um log dividido em várias fontes (planilha.Fonte).
+
+    Cada fonte tem o seu cache (CargaPlanilha). A ativa segue o TTL e a leitura incremental;
+    as demais (arquivo) usam `ttl_arquivo` (padrão: não expiram) e não são relidas por
+    `invalidar`; linhas enviadas a elas pela fila de escrita avisam via `marcar_escrita`, e só
+    a fonte que recebeu as linhas é relida (de forma incremental) na próxima chamada. As leituras
+    pendentes rodam em paralelo (até `max_paralelo` threads) e os DataFrames são unidos na
+    ordem das fontes, com a coluna `fonte`. Se só a última fonte ganhou linhas no fim, a
+    tabela unida também só ganhou linhas no fim e `delta` é preenchido. A tabela unida tem o
+    seu próprio TTL: lida do espelho (somente local ou planilha indisponível), só é relida
+    depois dele, como em CargaPlanilha.
+    """
+
+    def __init__(self, get_acesso, fontes, espelho=None, ttl=300.0, somente_local=False, max_paralelo=4,
+                 ttl_arquivo=float("inf")):
+        self.fontes = list(fontes)
+        self.cargas = [CargaPlanilha(get_acesso, None, ttl if f.ativa else ttl_arquivo, planilha=f.planilha, aba=f.aba)
+                       for f in self.fontes]
+        self.espelho = espelho
+        self.ttl = ttl
+        self.somente_local = somente_local
+        self.max_paralelo = max_paralelo
+        self.df = None
+        self.linhas = 0
+        self.lido_em = 0.0
+        self.versao = 0
+        self.delta = None
+        self._versoes = None  # versão de cada fonte usada na tabela unida
+        self.lock = threading.Lock()
+
+    def _unir(self, partes):
+        # partes: [(fonte, DataFrame)]; colunas ausentes em alguma parte ficam vazias, como células vazias
+        df = pd.concat([parte.assign(**{COLUNA_FONTE: f.nome}) for f, parte in partes], ignore_index=True)
+        colunas = [c for c in df.columns if any(c not in parte.columns for _, parte in partes)]
+        df[colunas] = df[colunas].fillna("")
+        df[COLUNA_FONTE] = pd.Categorical(df[COLUNA_FONTE], categories=[f.nome for f in self.fontes])
+        return df
+
+    def _guardar(self, df, delta=None):
+        self.versao += 1
+        self.df, self.linhas, self.delta, self.lido_em = df, len(df), delta, time.time()
+        return df
+
+    def atual(self):
+        # True quando carregar() devolveria o cache sem chamar a API (nem reler o espelho)
+        if self.df is None or time.time() - self.lido_em >= self.ttl:
+            return False
+        # tabela vinda do espelho não depende das fontes; senão todas precisam estar em dia
+        return self._versoes is None or all(c.atual() for c in self.cargas)
+
+    def carregar(self, forcar=False, avisar=_sem_aviso):
+        """Como CargaPlanilha.carregar; `forcar=True` relê só as fontes ativas."""
+        with self.lock:
+            self._ler(forcar, avisar)
+            return self.df, self.versao, self.delta
+
+    def _ler(self, forcar, avisar):
+        if not forcar and self.atual():
+            return self.df
+        if self.somente_local and self.espelho is not None:
+            self._versoes = None
+            return self._guardar(self.espelho.carregar())
+        pendentes = [(c, forcar and f.ativa) for f, c in zip(self.fontes, self.cargas)
+                     if (forcar and f.ativa) or not c.atual()]
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_paralelo, len(pendentes)))) as pool:
+                list(pool.map(lambda p: p[0].carregar(p[1]), pendentes))
+        except Exception:
+            if self.espelho is not None and self.espelho.tamanho() > 0:
+                # API indisponível: segue offline com o espelho local (sem a coluna de fonte)
+                avisar("⚠️ Planilha indisponível; exibindo dados do espelho local.")
+                self._versoes = None
+                return self._guardar(self.espelho.carregar())
+            raise
+
+        versoes = [c.versao for c in self.cargas]
+        if versoes == self._versoes:
+            self.lido_em = time.time()
+            return self.df
+        ultima = self.cargas[-1]
+        if (self._versoes is not None and versoes[:-1] == self._versoes[:-1]
+                and ultima.delta is not None and ultima.delta[0] == self._versoes[-1]):
+            # só a última fonte ganhou linhas no fim: a tabela unida também
+            novos = self._unir([(self.fontes[-1], ultima.df.iloc[ultima.delta[1]:])])
+            novos = novos.reindex(columns=self.df.columns, fill_value="")
+            df = pd.concat([self.df, novos], ignore_index=True)
+            df[COLUNA_FONTE] = pd.Categorical(df[COLUNA_FONTE], categories=self.df[COLUNA_FONTE].cat.categories)
+            delta = (self.versao, self.linhas)
+            _sincronizar_espelho(self.espelho, df, self.linhas, avisar)
+        else:
+            df = self._unir(list(zip(self.fontes, [c.df for c in self.cargas])))
+            delta = None
+            _sincronizar_espelho(self.espelho, df, 0, avisar)
+        self._versoes = versoes
+        return self._guardar(df, delta)
+
+    def invalidar(self):
+        # só as fontes ativas são relidas por completo na próxima chamada
+        with self.lock:
+            self.lido_em = 0.0
+            for f, c in zip(self.fontes, self.cargas):
+                if f.ativa:
+                    c.invalidar()
+
+    def marcar_escrita(self, fonte):
+        """Linhas gravadas na fonte de nome `fonte`: ela é relida na próxima chamada, mesmo sendo de arquivo."""
+        for f, c in zip(self.fontes, self.cargas):
+            if f.nome == fonte:
+                c.marcar_escrita()
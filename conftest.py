@@ -0,0 +1 @@
+# faz o pytest colocar a raiz do repositório no sys.path (os módulos ficam na raiz)
@@ -0,0 +1,77 @@
+from collections import namedtuple
+from indices import build_filter_index, filtrar_posicoes, intervalo_datas, opcoes
+from tabela import COLUNA_DATA
+
+# --------------------------
+# Consultas da aba "Análise por filtros"
+# --------------------------
+# A aba fala com uma "fonte" que responde às mesmas perguntas (opções, intervalo de datas,
+# agregados, últimas interações, conteúdos, exportação) para um conjunto de filtros.
+# ConsultaTabela responde em memória (tabela compacta + índices); espelho.EspelhoLocal
+# responde com SQL sobre o espelho local.
+
+# filtros ativos; None = sem filtro. fim é inclusivo.
+Filtros = namedtuple("Filtros", ["segurado", "integracao", "tipo_evento", "inicio", "fim"], defaults=(None,) * 5)
+
+COLUNAS_EXIBICAO = ["data_hora", "segurado", "canal", "tipo_evento", "integracao", "conteudo"]
+COLUNAS_EXPORTACAO = ["data_hora", "segurado", "canal", "conteudo", "tipo_evento", "integracao"]
+
+def contagem(serie):
+    # value_counts sem as categorias que não aparecem na seleção
+    cont = serie.value_counts()
+    return cont[cont > 0]
+
+class ConsultaTabela:
+    def __init__(self, tabela):
+        self.tabela = tabela
+        self.indice = build_filter_index(tabela.frame, "segurado", "integracao", "tipo_evento", COLUNA_DATA)
+
+    def opcoes(self, campo):
+        return opcoes(self.indice, campo)
+
+    def intervalo_datas(self):
+        return intervalo_datas(self.indice)
+
+    def posicoes(self, filtros):
+        return filtrar_posicoes(self.indice, *filtros)
+
+    def _serie(self, coluna, posicoes):
+        serie = self.tabela.coluna(coluna)
+        return serie if posicoes is None else serie.iloc[posicoes]
+
+    def agregados(self, filtros):
+        posicoes = self.posicoes(filtros)
+        datas = self._serie(COLUNA_DATA, posicoes)
+        canal = self._serie("canal", posicoes)
+        moda = canal.mode()
+        por_mes = self._serie("ano_mes", posicoes).value_counts().sort_index()
+        por_mes.index = por_mes.index.astype(str)
+        return {
+            "total": len(datas),
+            "primeira": datas.min(),
+            "ultima": datas.max(),
+            "canal_mais_usado": moda.iloc[0] if not moda.empty else "—",
+            "por_canal": contagem(canal),
+            "por_integracao": contagem(self._serie("integracao", posicoes)),
+            "por_mes": por_mes,
+        }
+
+    def _recentes(self, filtros):
+        # posições ordenadas da mais recente para a mais antiga, sem data por último; empates pela
+        # posição na planilha, como em segurados._ordem_recentes (índice da tabela = posição)
+        return self._serie(COLUNA_DATA, self.posicoes(filtros)).sort_values(ascending=False, kind="stable").index
+
+    def ultimas(self, filtros, n=50, colunas=COLUNAS_EXIBICAO):
+        return self.tabela.view(colunas, self._recentes(filtros)[:n])
+
+    def conteudos(self, filtros, n=None):
+        # conteúdos da seleção; com n, só os n mais recentes
+        if n is None:
+            return self._serie("conteudo", self.posicoes(filtros))
+        return self.tabela.coluna("conteudo").iloc[self._recentes(filtros)[:n]]
+
+    def contagem_status(self, filtros):
+        return contagem(self._serie("status", self.posicoes(filtros)))
+
+    def exportar(self, filtros, colunas=COLUNAS_EXPORTACAO):
+        return self.tabela.view(colunas, self.posicoes(filtros))
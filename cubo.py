@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+from tabela import COLUNA_DATA
+
+# --------------------------
+# Cubo de contagens (dia × canal × integração × tipo de evento × status, e segurado)
+# --------------------------
+# Montado uma vez por versão dos dados, em um objeto próprio que não muda depois de pronto
+# (consultas de sessões na versão anterior seguem com o cubo delas). As combinações (canal, integração, tipo de evento,
+# status) que aparecem na planilha são poucas; para cada dia e combinação o cubo guarda a
+# contagem e a primeira/última data e hora (matrizes dias × combinações, só com os dias que
+# aparecem: uma data digitada errada, como 2204, não cria séculos de linhas). Os agregados da aba
+# de análise (total, datas, canal mais usado, barras por canal/integração, status e a série
+# por mês, semana ou dia) saem somando um recorte dessas matrizes, sem varrer as linhas. Com
+# filtro de segurado, a consulta usa os códigos compactos por linha (dia, combinação,
+# segurado), que só as linhas do segurado atravessam. Cada dimensão tem o seu vocabulário
+# (valor -> código), estável entre versões: quando a planilha só ganhou linhas no fim, apenas
+# essas linhas são codificadas.
+
+DIMENSOES = ["canal", "integracao", "tipo_evento", "status"]
+GRANULARIDADES = {"Mês": "mes", "Semana": "semana", "Dia": "dia"}
+
+_SEM_DATA = np.iinfo(np.int64).min
+_MAXIMO = np.iinfo(np.int64).max
+_BITS = 15  # até 32768 valores distintos por dimensão na chave da combinação
+
+def _alinhado_dia(inicio, fim):
+    # o cubo só responde períodos de dias inteiros (como os da tela: 00:00 até 23:59:59)
+    if inicio is not None and pd.Timestamp(inicio) != pd.Timestamp(inicio).normalize():
+        return False
+    if fim is not None and (pd.Timestamp(fim) + pd.Timedelta(seconds=1)) != (pd.Timestamp(fim) + pd.Timedelta(seconds=1)).normalize():
+        return False
+    return True
+
+def _dia(momento):
+    return int(np.datetime64(pd.Timestamp(momento).normalize(), "D").astype(np.int64))
+
+def rotulos_periodo(dias, granularidade):
+    """Código de período (mês, semana iniciada na segunda ou dia) de cada dia (int desde 1970-01-01)
+    e a função que transforma códigos em rótulos."""
+    if granularidade == "mes":
+        codigos = dias.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        return codigos, lambda c: np.datetime_as_string(c.astype("datetime64[M]"))
+    # 1970-01-01 foi uma quinta-feira
+    codigos = dias - (dias + 3) % 7 if granularidade == "semana" else dias
+    return codigos, lambda c: np.datetime_as_string(c.astype("datetime64[D]"))
+
+class CuboInteracoes:
+    def __init__(self):
+        self.versao = None
+        self.linhas = 0
+        self._limpar()
+
+    def _limpar(self):
+        self.vocab = {d: {} for d in ["segurado"] + DIMENSOES}
+        self.valores = {d: [] for d in ["segurado"] + DIMENSOES}
+        self.minusculas = {d: {} for d in ["segurado"] + DIMENSOES}  # valor em minúsculas -> códigos
+        self.combinacoes = {}  # chave da combinação -> código
+        self.dims_combinacao = np.empty((0, len(DIMENSOES)), dtype=np.int64)
+        vazio = np.empty(0, dtype=np.int64)
+        self.segurado, self.dia, self.combinacao, self.momento = vazio, vazio, vazio, vazio
+
+    def atualizar(self, tabela, versao, delta=None):
+        """Cubo da versão `versao`, em um objeto novo (este não é alterado); com
+        delta=(versão anterior, linhas anteriores) igual ao deste cubo, codifica só as linhas novas."""
+        if versao == self.versao:
+            return self
+        if delta is not None and tuple(delta) == (self.versao, self.linhas) and len(tabela) >= self.linhas:
+            novo, inicio = self._copia(), self.linhas
+        else:
+            novo, inicio = CuboInteracoes(), 0
+        if inicio == 0 or len(tabela) > inicio:
+            novo._acrescentar(tabela, inicio)
+            novo._montar_matrizes()
+        novo.versao, novo.linhas = versao, len(tabela)
+        return novo
+
+    def _copia(self):
+        # vocabulários copiados (são estendidos no lugar); arrays e matrizes são sempre trocados
+        # por novos, então podem ser compartilhados
+        novo = CuboInteracoes()
+        novo.vocab = {d: dict(v) for d, v in self.vocab.items()}
+        novo.valores = {d: list(v) for d, v in self.valores.items()}
+        novo.minusculas = {d: {chave: list(c) for chave, c in v.items()} for d, v in self.minusculas.items()}
+        novo.combinacoes = dict(self.combinacoes)
+        novo.dims_combinacao = self.dims_combinacao
+        novo.segurado, novo.dia, novo.combinacao, novo.momento = self.segurado, self.dia, self.combinacao, self.momento
+        novo.dias_unicos, novo.sem_data = self.dias_unicos, self.sem_data
+        novo.contagens, novo.primeira, novo.ultima = self.contagens, self.primeira, self.ultima
+        return novo
+
+    def _codigos(self, dimensao, serie):
+        # códigos do vocabulário do cubo para a coluna categórica (categorias novas entram no fim)
+        vocab, valores = self.vocab[dimensao], self.valores[dimensao]
+        por_categoria = np.array([vocab.setdefault(v, len(vocab)) for v in serie.cat.categories.astype(str)], dtype=np.int64)
+        for valor in list(vocab)[len(valores):]:
+            self.minusculas[dimensao].setdefault(valor.lower(), []).append(len(valores))
+            valores.append(valor)
+        return por_categoria[serie.cat.codes.to_numpy()]
+
+    def _acrescentar(self, tabela, inicio):
+        datas = tabela.coluna(COLUNA_DATA).iloc[inicio:].to_numpy(dtype="datetime64[ns]")
+        sem_data = np.isnat(datas)
+        dia = np.where(sem_data, _SEM_DATA, datas.astype("datetime64[D]").astype(np.int64))
+        chave = np.zeros(len(datas), dtype=np.int64)
+        for dimensao in DIMENSOES:
+            chave = (chave << _BITS) | self._codigos(dimensao, tabela.coluna(dimensao).iloc[inicio:])
+        unicas, inverso = np.unique(chave, return_inverse=True)
+        novas = [int(c) for c in unicas if int(c) not in self.combinacoes]
+        for c in novas:
+            self.combinacoes[c] = len(self.combinacoes)
+        if novas:
+            deslocamentos = _BITS * np.arange(len(DIMENSOES) - 1, -1, -1)
+            dims = (np.array(novas, dtype=np.int64)[:, None] >> deslocamentos) & ((1 << _BITS) - 1)
+            self.dims_combinacao = np.vstack([self.dims_combinacao, dims])
+        combinacao = np.array([self.combinacoes[int(c)] for c in unicas], dtype=np.int64)[inverso.ravel()]
+        self.segurado = np.concatenate([self.segurado, self._codigos("segurado", tabela.coluna("segurado").iloc[inicio:])])
+        self.dia = np.concatenate([self.dia, dia])
+        self.combinacao = np.concatenate([self.combinacao, combinacao])
+        self.momento = np.concatenate([self.momento, np.where(sem_data, _SEM_DATA, datas.view(np.int64))])
+
+    def _montar_matrizes(self):
+        k = len(self.combinacoes)
+        datadas = self.dia != _SEM_DATA
+        dias = self.dia[datadas]
+        # linha i das matrizes = dia dias_unicos[i]
+        self.dias_unicos = np.unique(dias)
+        n_dias = len(self.dias_unicos)
+        celula = np.searchsorted(self.dias_unicos, dias) * k + self.combinacao[datadas]
+        momentos = self.momento[datadas]
+        self.contagens = np.bincount(celula, minlength=n_dias * k).reshape(n_dias, k)
+        self.primeira = np.full(n_dias * k, _MAXIMO, dtype=np.int64)
+        np.minimum.at(self.primeira, celula, momentos)
+        self.primeira = self.primeira.reshape(n_dias, k)
+        self.ultima = np.full(n_dias * k, _SEM_DATA, dtype=np.int64)
+        np.maximum.at(self.ultima, celula, momentos)
+        self.ultima = self.ultima.reshape(n_dias, k)
+        self.sem_data = np.bincount(self.combinacao[~datadas], minlength=k)
+
+    def atende(self, filtros):
+        """True quando o cubo responde a esses filtros (período em dias inteiros)."""
+        return self.versao is not None and _alinhado_dia(filtros.inicio, filtros.fim)
+
+    def intervalo_datas(self):
+        if self.versao is None or len(self.dias_unicos) == 0:
+            return pd.NaT, pd.NaT
+        return (pd.Timestamp(np.datetime64(int(self.dias_unicos[0]), "D")),
+                pd.Timestamp(np.datetime64(int(self.dias_unicos[-1]), "D")))
+
+    def _codigos_valor(self, dimensao, valor):
+        # códigos cujo valor é igual a `valor`, sem diferenciar maiúsculas (como os índices de filtro)
+        return self.minusculas[dimensao].get(str(valor).lower(), [])
+
+    def _selecao(self, filtros):
+        """(contagem por combinação, dias, contagem por dia, primeira, última) da seleção."""
+        combinacoes = np.ones(len(self.combinacoes), dtype=bool)
+        for i, dimensao in enumerate(DIMENSOES):
+            valor = getattr(filtros, dimensao, None)
+            if valor:
+                combinacoes &= np.isin(self.dims_combinacao[:, i], self._codigos_valor(dimensao, valor))
+        com_periodo = filtros.inicio is not None or filtros.fim is not None
+        # linhas das matrizes no período
+        lo = 0 if filtros.inicio is None else int(np.searchsorted(self.dias_unicos, _dia(filtros.inicio), "left"))
+        hi = len(self.dias_unicos) if filtros.fim is None else int(np.searchsorted(self.dias_unicos, _dia(filtros.fim), "right"))
+        hi = max(hi, lo)
+
+        if filtros.segurado:
+            # só as linhas do segurado
+            escolhidos = np.zeros(len(self.valores["segurado"]), dtype=bool)
+            escolhidos[self._codigos_valor("segurado", filtros.segurado)] = True
+            linhas = np.flatnonzero(escolhidos[self.segurado])
+            linhas = linhas[combinacoes[self.combinacao[linhas]]]
+            dia = self.dia[linhas]
+            if com_periodo:
+                dentro = dia != _SEM_DATA
+                if filtros.inicio is not None:
+                    dentro &= dia >= _dia(filtros.inicio)
+                if filtros.fim is not None:
+                    dentro &= dia <= _dia(filtros.fim)
+                linhas = linhas[dentro]
+                dia = self.dia[linhas]
+            por_combinacao = np.bincount(self.combinacao[linhas], minlength=len(combinacoes))
+            dias, por_dia = np.unique(dia[dia != _SEM_DATA], return_counts=True)
+            momentos = self.momento[linhas]
+            momentos = momentos[momentos != _SEM_DATA]
+            primeira = int(momentos.min()) if len(momentos) else None
+            ultima = int(momentos.max()) if len(momentos) else None
+            return por_combinacao, dias, por_dia, primeira, ultima
+
+        colunas = np.flatnonzero(combinacoes)
+        recorte = self.contagens[lo:hi][:, colunas]
+        por_combinacao = np.zeros(len(combinacoes), dtype=np.int64)
+        por_combinacao[colunas] = recorte.sum(axis=0)
+        if not com_periodo:
+            por_combinacao[colunas] += self.sem_data[colunas]
+        por_dia = recorte.sum(axis=1)
+        com_contagem = por_dia > 0
+        dias = self.dias_unicos[lo:hi][com_contagem]
+        primeira = ultima = None
+        if com_contagem.any():
+            primeira = int(self.primeira[lo:hi][:, colunas].min())
+            ultima = int(self.ultima[lo:hi][:, colunas].max())
+        return por_combinacao, dias, por_dia[com_contagem], primeira, ultima
+
+    def _contagem(self, por_combinacao, dimensao):
+        i = DIMENSOES.index(dimensao)
+        soma = np.bincount(self.dims_combinacao[:, i], weights=por_combinacao,
+                           minlength=len(self.valores[dimensao])).astype(np.int64)
+        cont = pd.Series(soma, index=pd.Index(self.valores[dimensao], name=dimensao), name="count")
+        return cont[cont > 0].sort_values(ascending=False, kind="stable")
+
+    @staticmethod
+    def _por_periodo(dias, por_dia, granularidade):
+        codigos, rotulo = rotulos_periodo(dias, granularidade)
+        unicos, inverso = np.unique(codigos, return_inverse=True)
+        soma = np.bincount(inverso.ravel(), weights=por_dia, minlength=len(unicos)).astype(np.int64)
+        return pd.Series(soma, index=pd.Index(rotulo(unicos) if len(unicos) else [], name=granularidade), name="count")
+
+    def agregados(self, filtros):
+        """Mesmo formato de ConsultaTabela.agregados."""
+        por_combinacao, dias, por_dia, primeira, ultima = self._selecao(filtros)
+        total = int(por_combinacao.sum())
+        por_canal = self._contagem(por_combinacao, "canal")
+        # moda como em Series.mode: maior contagem; empate, o menor valor
+        moda = sorted(por_canal.index[por_canal == por_canal.max()]) if total else []
+        return {
+            "total": total,
+            "primeira": pd.Timestamp(primeira) if primeira is not None else pd.NaT,
+            "ultima": pd.Timestamp(ultima) if ultima is not None else pd.NaT,
+            "canal_mais_usado": moda[0] if moda else "—",
+            "por_canal": por_canal,
+            "por_integracao": self._contagem(por_combinacao, "integracao"),
+            "por_mes": self._por_periodo(dias, por_dia, "mes"),
+        }
+
+    def contagem_status(self, filtros):
+        return self._contagem(self._selecao(filtros)[0], "status")
+
+    def por_periodo(self, filtros, granularidade="mes"):
+        """Interações por período ("mes", "semana" ou "dia"), em ordem cronológica."""
+        _, dias, por_dia, _, _ = self._selecao(filtros)
+        return self._por_periodo(dias, por_dia, granularidade)
@@ -0,0 +1,115 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# Conversão de datas da planilha (serial Excel e strings dd/mm/aaaa)
+# --------------------------
+EXCEL_ORIGIN = "1899-12-30"
+
+def excel_serial_to_datetime(serial):
+    try:
+        return pd.to_datetime(float(serial), unit='D', origin=EXCEL_ORIGIN)
+    except Exception:
+        return pd.NaT
+
+def parse_date_value(v):
+    # versão por célula; usada como referência e para valores de tipo incomum
+    if pd.isna(v) or (isinstance(v, str) and v.strip() == ""):
+        return pd.NaT
+    if isinstance(v, (pd.Timestamp, datetime)):
+        return pd.to_datetime(v)
+    try:
+        if isinstance(v, (int, float, np.integer, np.floating)):
+            return excel_serial_to_datetime(v)
+    except:
+        pass
+    s = str(v).strip()
+    try:
+        sr = s.replace(",", ".")
+        if all(ch.isdigit() or ch == '.' for ch in sr):
+            return excel_serial_to_datetime(float(sr))
+    except:
+        pass
+    try:
+        return pd.to_datetime(s, dayfirst=True, errors='coerce')
+    except:
+        return pd.NaT
+
+def _seriais_para_datetime(valores):
+    # uma única conversão para todo o grupo; fora do intervalo suportado vira NaT
+    valores = np.asarray(valores, dtype="float64").copy()
+    valores[~np.isfinite(valores)] = np.nan
+    return pd.to_datetime(valores, unit='D', origin=EXCEL_ORIGIN, errors='coerce')
+
+def _float_ou_nan(s):
+    try:
+        return float(s)
+    except ValueError:
+        return np.nan
+
+# formatos dd/mm da planilha, sempre com o dia primeiro (sem inferência de formato: o pandas
+# deduz o formato pelo primeiro valor e, se ele só fizer sentido como mm/dd, inverte os demais)
+FORMATOS_DIA_MES = ["%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S"]
+
+def _strings_para_datetime(strings):
+    # converte apenas os valores distintos, um formato explícito por vez; o que não casar com
+    # nenhum cai para a conversão individual (mesmo resultado de parse_date_value)
+    unicos = pd.Series(pd.unique(strings), dtype=object)
+    convertidos = pd.Series(pd.NaT, index=unicos, dtype="datetime64[ns]")
+    pendentes = unicos
+    for formato in FORMATOS_DIA_MES:
+        if pendentes.empty:
+            break
+        datas = pd.to_datetime(pendentes, format=formato, errors='coerce')
+        ok = datas.notna().to_numpy()
+        convertidos[pendentes[ok].to_numpy()] = datas[ok].to_numpy()
+        pendentes = pendentes[~ok]
+    for s in pendentes:
+        convertidos[s] = parse_date_value(s)
+    return strings.map(convertidos)
+
+def parse_date_series(serie):
+    """Equivalente vetorizado de `serie.apply(parse_date_value)`.
+
+    Separa a coluna em grupos (números/seriais Excel, seriais em texto com vírgula ou ponto,
+    strings de data) e converte cada grupo com uma única chamada ao pandas.
+    """
+    serie = pd.Series(serie)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return pd.Series(_seriais_para_datetime(serie.to_numpy()), index=serie.index)
+
+    valores = serie.reset_index(drop=True).astype(object)
+    resultado = pd.Series(pd.NaT, index=valores.index, dtype="datetime64[ns]")
+    vazio = valores.isna().to_numpy()
+    eh_str = valores.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    eh_num = valores.map(lambda v: isinstance(v, (int, float, np.integer, np.floating))).to_numpy(dtype=bool) & ~vazio
+
+    if eh_num.any():
+        resultado[eh_num] = _seriais_para_datetime(valores[eh_num].to_numpy())
+
+    # strings: brancos viram NaT; só dígitos/pontos (após trocar vírgula) são seriais
+    strings = valores[eh_str].astype(str).str.strip()
+    strings = strings[strings != ""]
+    if not strings.empty:
+        sr = strings.str.replace(",", ".", regex=False)
+        candidatos = sr[sr.str.fullmatch(r"[\d.]+").to_numpy(dtype=bool)]
+        numeros = pd.to_numeric(candidatos, errors='coerce')
+        falhas = numeros.isna()
+        if falhas.any():
+            numeros[falhas] = candidatos[falhas].map(_float_ou_nan)
+        seriais = numeros.dropna()
+        if not seriais.empty:
+            resultado[seriais.index] = _seriais_para_datetime(seriais.to_numpy())
+        textos = strings.drop(seriais.index)
+        if not textos.empty:
+            resultado[textos.index] = _strings_para_datetime(textos).to_numpy()
+
+    # demais tipos (Timestamp, datetime, date, ...) são raros: conversão individual
+    outros = ~(eh_str | eh_num | vazio)
+    if outros.any():
+        resultado[outros] = valores[outros].map(parse_date_value).to_numpy()
+    resultado.index = serie.index
+    return resultado
@@ -0,0 +1,174 @@
+import email.utils
+import mailbox
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from email import policy
+from email.parser import BytesParser
+
+# -------------------------
+# Leitura de e-mails (.eml, .zip, .mbox)
+# -------------------------
+# Funções sem Streamlit, usadas pela página de importação. Em lotes grandes as mensagens são
+# lidas em um pool de processos: os bytes de cada mensagem vão para um processo filho, que
+# devolve assunto, data, corpo em texto e segurado. Os resultados voltam conforme ficam
+# prontos e só `max_pendentes` mensagens ficam em trânsito (memória limitada).
+
+# padrões do assunto compilados uma vez
+_SEGURADO_PIPE = re.compile(r"\|\s*(.*?)\s*-\s*\d")
+_SEGURADO_CODIGO = re.compile(r"-\s*\d+\s*-\s*(.*)")
+_DOCUMENTO = re.compile(r"\d{11,14}")
+
+LOTE_SERIAL_MAX = 20  # abaixo disso o pool não compensa
+# processos filhos novos (e não cópias via fork do servidor, com suas threads e locks)
+METODO_INICIO = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def extrair_nome_segurado(assunto):
+    m = _SEGURADO_PIPE.search(assunto)
+    if m:
+        return m.group(1).strip()
+
+    m2 = _SEGURADO_CODIGO.search(assunto)
+    if m2:
+        nome = m2.group(1).strip()
+        nome = _DOCUMENTO.sub("", nome).strip()
+        return nome
+
+    if "|" in assunto:
+        return assunto.split("|")[-1].strip()
+
+    return assunto.strip()
+
+def ler_eml(file):
+    """(assunto, data, corpo em texto) de um .eml (arquivo aberto ou bytes).
+
+    Só as partes text/plain que não são anexos são decodificadas; anexos são ignorados.
+    """
+    raw = file if isinstance(file, (bytes, bytearray)) else file.read()
+    msg = BytesParser(policy=policy.default).parsebytes(raw)
+
+    subject = msg.get("Subject", "")
+    date_str = msg.get("Date")
+
+    try:
+        dt = email.utils.parsedate_to_datetime(date_str)
+    except:
+        dt = datetime.now()
+
+    if msg.is_multipart():
+        parts = []
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain" and not part.is_attachment():
+                try:
+                    parts.append(part.get_content())
+                except:
+                    pass
+        body = "\n".join(parts).strip()
+    else:
+        try:
+            body = msg.get_content().strip()
+        except:
+            body = ""
+
+    return subject, dt, body
+
+def ler_mensagem(nome, dados):
+    """Resultado de uma mensagem como dict (roda nos processos do pool)."""
+    try:
+        assunto, data_hora, corpo = ler_eml(dados)
+    except Exception as e:
+        return {"nome": nome, "erro": str(e)}
+    return {
+        "nome": nome,
+        "assunto": str(assunto),
+        "segurado": extrair_nome_segurado(str(assunto)),
+        "data_hora": data_hora,
+        "corpo": corpo,
+    }
+
+def iterar_mensagens(arquivo):
+    """Gera (nome, bytes) para cada mensagem de um upload .eml, .zip ou .mbox, uma por vez."""
+    nome = arquivo.name
+    extensao = nome.lower().rsplit(".", 1)[-1]
+    if extensao == "zip":
+        with zipfile.ZipFile(arquivo) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(".eml"):
+                    yield f"{nome}/{info.filename}", zf.read(info)
+    elif extensao == "mbox":
+        # mailbox.mbox precisa de um caminho em disco; copia o upload em blocos
+        with tempfile.NamedTemporaryFile(suffix=".mbox") as tmp:
+            shutil.copyfileobj(arquivo, tmp)
+            tmp.flush()
+            caixa = mailbox.mbox(tmp.name, create=False)
+            try:
+                for i, chave in enumerate(caixa.iterkeys()):
+                    yield f"{nome}#{i + 1}", caixa.get_bytes(chave)
+            finally:
+                caixa.close()
+    else:
+        yield nome, arquivo.read()
+
+def contar_mensagens(arquivo):
+    """Nº de mensagens de um upload .eml, .zip ou .mbox, sem decodificá-las (para o progresso).
+
+    Volta o arquivo para o início, pronto para `iterar_mensagens`.
+    """
+    extensao = arquivo.name.lower().rsplit(".", 1)[-1]
+    try:
+        if extensao == "zip":
+            with zipfile.ZipFile(arquivo) as zf:
+                return sum(1 for info in zf.infolist() if not info.is_dir() and info.filename.lower().endswith(".eml"))
+        if extensao == "mbox":
+            # mesma regra do mailbox.mbox: cada mensagem começa em uma linha "From "
+            return sum(1 for linha in arquivo if linha.startswith(b"From "))
+        return 1
+    finally:
+        arquivo.seek(0)
+
+def ler_mensagens(mensagens, processos=None, max_pendentes=None):
+    """Lê as mensagens de `mensagens` (iterável de (nome, bytes)) e gera os resultados de
+    `ler_mensagem` na ordem em que ficam prontos, cada um com o campo "ordem" (posição de entrada).
+
+    Com até LOTE_SERIAL_MAX mensagens tudo roda no processo atual; acima disso, em um pool de
+    `processos` processos (padrão: nº de CPUs) com no máximo `max_pendentes` mensagens em trânsito.
+    """
+    processos = processos or os.cpu_count() or 1
+    max_pendentes = max_pendentes or processos * 4
+    iterador = iter(mensagens)
+    primeiras = []
+    for item in iterador:
+        primeiras.append(item)
+        if len(primeiras) > LOTE_SERIAL_MAX:
+            break
+    if len(primeiras) <= LOTE_SERIAL_MAX or processos == 1:
+        for ordem, (nome, dados) in enumerate(_encadear(primeiras, iterador)):
+            yield dict(ler_mensagem(nome, dados), ordem=ordem)
+        return
+
+    with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context(METODO_INICIO)) as pool:
+        pendentes = {}
+        entrada = enumerate(_encadear(primeiras, iterador))
+        esgotado = False
+        while True:
+            while not esgotado and len(pendentes) < max_pendentes:
+                try:
+                    ordem, (nome, dados) = next(entrada)
+                except StopIteration:
+                    esgotado = True
+                    break
+                pendentes[pool.submit(ler_mensagem, nome, dados)] = ordem
+            if not pendentes:
+                return
+            prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                yield dict(futuro.result(), ordem=pendentes.pop(futuro))
+
+def _encadear(primeiras, resto):
+    yield from primeiras
+    yield from resto
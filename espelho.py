@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from consultas import COLUNAS_EXIBICAO, COLUNAS_EXPORTACAO
+from datas import parse_date_series
+from status import classificar_serie
+
+# --------------------------
+# Espelho local da planilha (SQLite)
+# --------------------------
+# Cópia das colunas esperadas da planilha, sincronizada a cada leitura (só as linhas novas
+# quando a leitura foi incremental). Serve de fonte de consultas para o painel (filtros e
+# agrupamentos executados em SQL, com índices) e de dados offline quando a API falha.
+
+CAMPOS_TEXTO = ["segurado", "canal", "conteudo", "tipo_evento", "integracao"]
+CAMPOS_FILTRO = ["segurado", "integracao", "tipo_evento"]
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS interacoes (
+    pos INTEGER PRIMARY KEY,
+    data_hora INTEGER,
+    ano_mes TEXT,
+    segurado TEXT, segurado_lower TEXT,
+    canal TEXT,
+    conteudo TEXT,
+    tipo_evento TEXT, tipo_evento_lower TEXT,
+    integracao TEXT, integracao_lower TEXT,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interacoes_segurado ON interacoes (segurado_lower, data_hora);
+CREATE INDEX IF NOT EXISTS idx_interacoes_data_hora ON interacoes (data_hora);
+CREATE INDEX IF NOT EXISTS idx_interacoes_integracao ON interacoes (integracao_lower, data_hora);
+CREATE INDEX IF NOT EXISTS idx_interacoes_tipo_evento ON interacoes (tipo_evento_lower);
+CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+def _ns(ts):
+    return None if ts is None or pd.isna(ts) else int(pd.Timestamp(ts).value)
+
+def _para_registros(df, inicio):
+    # converte linhas da planilha (formato de get_all_records) para as colunas do espelho
+    datas = parse_date_series(df["data_hora"]).reset_index(drop=True)
+    ns = [None if pd.isna(d) else int(d.value) for d in datas]
+    ano_mes = datas.dt.strftime("%Y-%m").astype(object).where(datas.notna(), None).tolist()
+    texto = {c: df[c].astype(str).str.strip().tolist() for c in CAMPOS_TEXTO}
+    status = classificar_serie(pd.Series(texto["conteudo"], dtype="object")).astype(str).tolist()
+    return list(zip(
+        range(inicio, inicio + len(df)), ns, ano_mes,
+        texto["segurado"], [v.lower() for v in texto["segurado"]],
+        texto["canal"],
+        texto["conteudo"],
+        texto["tipo_evento"], [v.lower() for v in texto["tipo_evento"]],
+        texto["integracao"], [v.lower() for v in texto["integracao"]],
+        status,
+    ))
+
+def _datas(valores):
+    # nanossegundos como inteiros: float64 arredonda as datas atuais (~1,7e18 ns) em centenas de ns
+    return pd.Series(pd.to_datetime(pd.array(valores, dtype="Int64"), unit="ns"))
+
+class EspelhoLocal:
+    def __init__(self, caminho):
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        colunas = [r[1] for r in self._conn.execute("PRAGMA table_info(interacoes)")]
+        if colunas and "status" not in colunas:
+            # espelho criado por uma versão anterior: é só um cache, então recria do zero
+            self._conn.execute("DROP TABLE interacoes")
+        self._conn.executescript(_ESQUEMA)
+
+    # ---- sincronização ----
+    def sincronizar(self, df, completa, inicio=0):
+        """Grava linhas da planilha no espelho.
+
+        completa=True substitui todo o conteúdo por `df`; senão acrescenta `df` a partir da
+        posição `inicio` (linhas novas de uma leitura incremental).
+        """
+        registros = _para_registros(df, inicio)
+        with self._lock, self._conn:
+            if completa:
+                self._conn.execute("DELETE FROM interacoes")
+            else:
+                self._conn.execute("DELETE FROM interacoes WHERE pos >= ?", (inicio,))
+            self._conn.executemany(f"INSERT INTO interacoes VALUES ({','.join('?' * 12)})", registros)
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('sincronizado_em', ?)", (str(time.time()),))
+
+    def sincronizado_em(self):
+        with self._lock:
+            linha = self._conn.execute("SELECT valor FROM meta WHERE chave = 'sincronizado_em'").fetchone()
+        return float(linha[0]) if linha else None
+
+    def tamanho(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM interacoes").fetchone()[0]
+
+    def carregar(self):
+        """DataFrame no formato da planilha (data_hora já como datetime64) para uso offline."""
+        df = self._consulta_df("SELECT data_hora, segurado, canal, conteudo, tipo_evento, integracao FROM interacoes ORDER BY pos")
+        df["data_hora"] = _datas(df["data_hora"])
+        return df
+
+    # ---- consultas ----
+    def _consulta(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _consulta_df(self, sql, params=()):
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            nomes = [d[0] for d in cur.description]
+            linhas = cur.fetchall()
+        df = pd.DataFrame(linhas, columns=nomes)
+        if "data_hora" in nomes:
+            # com algum NULL o DataFrame tornaria a coluna float64 e perderia precisão
+            i = nomes.index("data_hora")
+            df["data_hora"] = pd.array([linha[i] for linha in linhas], dtype="Int64")
+        return df
+
+    def _where(self, filtros):
+        condicoes, params = [], []
+        for campo in CAMPOS_FILTRO:
+            valor = getattr(filtros, campo)
+            if valor:
+                condicoes.append(f"{campo}_lower = ?")
+                params.append(str(valor).lower())
+        if filtros.inicio is not None:
+            condicoes.append("data_hora >= ?")
+            params.append(_ns(filtros.inicio))
+        if filtros.fim is not None:
+            condicoes.append("data_hora <= ?")
+            params.append(_ns(filtros.fim))
+        return (" WHERE " + " AND ".join(condicoes) if condicoes else ""), params
+
+    def opcoes(self, campo):
+        return [r[0] for r in self._consulta(f"SELECT DISTINCT {campo} FROM interacoes ORDER BY {campo}")]
+
+    def intervalo_datas(self):
+        minimo, maximo = self._consulta("SELECT MIN(data_hora), MAX(data_hora) FROM interacoes")[0]
+        return _datas([minimo, maximo]).tolist()
+
+    def _contagem(self, campo, where, params, ordem="n DESC, {campo}"):
+        linhas = self._consulta(
+            f"SELECT {campo}, COUNT(*) AS n FROM interacoes{where} GROUP BY {campo} ORDER BY {ordem.format(campo=campo)}",
+            params)
+        return pd.Series([n for _, n in linhas], index=[v for v, _ in linhas], name="count", dtype="int64")
+
+    def agregados(self, filtros):
+        where, params = self._where(filtros)
+        total, minimo, maximo = self._consulta(f"SELECT COUNT(*), MIN(data_hora), MAX(data_hora) FROM interacoes{where}", params)[0]
+        primeira, ultima = _datas([minimo, maximo]).tolist()
+        por_canal = self._contagem("canal", where, params)
+        onde_mes = where + (" AND " if where else " WHERE ") + "ano_mes IS NOT NULL"
+        return {
+            "total": total,
+            "primeira": primeira,
+            "ultima": ultima,
+            "canal_mais_usado": por_canal.index[0] if len(por_canal) else "—",
+            "por_canal": por_canal,
+            "por_integracao": self._contagem("integracao", where, params),
+            "por_mes": self._contagem("ano_mes", onde_mes, params, ordem="ano_mes"),
+        }
+
+    def ultimas(self, filtros, n=50, colunas=COLUNAS_EXIBICAO):
+        where, params = self._where(filtros)
+        campos = [c for c in colunas if c != "data_hora"]
+        df = self._consulta_df(
+            f"SELECT data_hora, {', '.join(campos)} FROM interacoes{where} ORDER BY data_hora DESC, pos DESC LIMIT ?",
+            params + [int(n)])
+        return self._formatar(df)[colunas]
+
+    def conteudos(self, filtros, n=None):
+        where, params = self._where(filtros)
+        if n is None:
+            linhas = self._consulta(f"SELECT conteudo FROM interacoes{where}", params)
+        else:
+            linhas = self._consulta(f"SELECT conteudo FROM interacoes{where} ORDER BY data_hora DESC, pos DESC LIMIT ?", params + [int(n)])
+        return pd.Series([r[0] for r in linhas], name="conteudo", dtype="object")
+
+    def contagem_status(self, filtros):
+        where, params = self._where(filtros)
+        return self._contagem("status", where, params)
+
+    def exportar(self, filtros, colunas=COLUNAS_EXPORTACAO):
+        where, params = self._where(filtros)
+        campos = [c for c in colunas if c != "data_hora"]
+        df = self._consulta_df(f"SELECT data_hora, {', '.join(campos)} FROM interacoes{where} ORDER BY pos", params)
+        return self._formatar(df)[colunas]
+
+    @staticmethod
+    def _formatar(df):
+        datas = _datas(df["data_hora"])
+        df["data_hora"] = datas.dt.strftime("%d/%m/%Y %H:%M").where(datas.notna(), "")
+        return df
@@ -0,0 +1,49 @@
+import gzip
+import io
+import time
+
+# --------------------------
+# Exportação sob demanda (CSV, CSV gzip, Parquet)
+# --------------------------
+# O arquivo só é gerado quando pedido. O CSV é escrito em blocos de linhas direto em um
+# buffer de bytes (sem montar a string inteira e depois codificar), opcionalmente comprimido.
+
+LINHAS_POR_BLOCO = 50000
+
+FORMATOS = {
+    "CSV": {"extensao": "csv", "mime": "text/csv"},
+    "CSV (gzip)": {"extensao": "csv.gz", "mime": "application/gzip"},
+    "Parquet": {"extensao": "parquet", "mime": "application/vnd.apache.parquet"},
+}
+
+def escrever_csv(df, destino, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Escreve `df` como CSV UTF-8 no arquivo binário `destino`, um bloco de linhas por vez."""
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="", write_through=True)
+    try:
+        for inicio in range(0, max(len(df), 1), linhas_por_bloco):
+            df.iloc[inicio:inicio + linhas_por_bloco].to_csv(texto, index=False, header=(inicio == 0))
+        texto.flush()
+    finally:
+        texto.detach()
+
+def gerar_exportacao(df, formato="CSV"):
+    """Gera o arquivo no formato pedido e mede tempo e tamanho."""
+    inicio = time.perf_counter()
+    buffer = io.BytesIO()
+    if formato == "CSV":
+        escrever_csv(df, buffer)
+    elif formato == "CSV (gzip)":
+        with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6) as gz:
+            escrever_csv(df, gz)
+    elif formato == "Parquet":
+        df.to_parquet(buffer, index=False)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    dados = buffer.getvalue()
+    return {
+        "dados": dados,
+        "bytes": len(dados),
+        "segundos": time.perf_counter() - inicio,
+        "linhas": len(df),
+        **FORMATOS[formato],
+    }
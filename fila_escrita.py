@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# -------------------------
+# Fila de escrita na planilha (SQLite + thread de envio)
+# -------------------------
+# O importador só grava as linhas aqui e segue; uma thread de fundo junta as pendentes em
+# chamadas append_rows. Linhas repetidas (mesmo segurado, data_hora e conteúdo) são
+# descartadas na entrada. Se o envio falhar, a linha continua na fila e é reenviada com
+# espera crescente; depois de `max_tentativas` fica como "falha" até ser reenfileirada.
+# Um envio que falhou (5xx, timeout) pode ter sido gravado mesmo assim: antes de reenviar,
+# o fim da planilha é conferido e as linhas que já estão lá não são enviadas de novo.
+# O arquivo sobrevive a reinícios do app, então nada se perde se o processo cair.
+# Cada linha guarda o destino (nome da fonte em planilha.Fonte; vazio = fonte ativa) e cada
+# lote vai inteiro para um destino só.
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "fila_escrita.sqlite")
+COLUNAS_PLANILHA = ["segurado", "canal", "data_hora", "conteudo", "tipo_evento", "integracao"]
+LOTE_MAX_LINHAS = 500
+CAUDA_CONFERENCIA = 1000  # linhas lidas do fim da planilha, além do tamanho do lote, antes de reenviar
+
+def chave_linha(linha):
+    # identidade da interação: segurado + data_hora + conteúdo (sem diferenciar espaços nas pontas)
+    segurado, data_hora, conteudo = (str(linha[COLUNAS_PLANILHA.index(c)]).strip()
+                                     for c in ("segurado", "data_hora", "conteudo"))
+    return hashlib.sha256(f"{segurado}\0{data_hora}\0{conteudo}".encode("utf-8")).hexdigest()
+
+def _chave_conferencia(linha):
+    # como chave_linha, com a data normalizada: a planilha devolve a data já formatada por ela
+    import pandas as pd
+    from datas import parse_date_value
+    linha = [str(v) for v in linha] + [""] * len(COLUNAS_PLANILHA)
+    i = COLUNAS_PLANILHA.index("data_hora")
+    data = parse_date_value(linha[i])
+    if pd.notna(data):
+        linha[i] = data.isoformat()
+    return chave_linha(linha)
+
+class FilaEscrita:
+    def __init__(self, enviar, caminho=CAMINHO_PADRAO, lote_max=LOTE_MAX_LINHAS, max_tentativas=8,
+                 espera_inicial=5.0, espera_maxima=600.0, conferir=None):
+        """enviar(linhas, destino): grava uma lista de linhas no destino (ex.: append_rows);
+        conferir(destino, n): últimas linhas do destino (pelo menos n), lidas antes de reenviar."""
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self.enviar = enviar
+        self.conferir = conferir
+        self.lote_max = lote_max
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.ultimo_erro = None
+        self.ultimo_envio = None
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fila (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chave TEXT NOT NULL UNIQUE,
+                linha TEXT NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendente',
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                proxima_em REAL NOT NULL DEFAULT 0,
+                criado_em REAL NOT NULL,
+                enviado_em REAL,
+                erro TEXT,
+                destino TEXT NOT NULL DEFAULT ''
+            )""")
+        colunas = [r[1] for r in self._conn.execute("PRAGMA table_info(fila)")]
+        if "destino" not in colunas:
+            # fila criada antes do destino por linha: as pendentes vão para a fonte ativa
+            self._conn.execute("ALTER TABLE fila ADD COLUMN destino TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fila_estado ON fila (estado, proxima_em)")
+        self._conn.commit()
+
+    # ---- entrada ----
+    def enfileirar(self, linhas, destino=""):
+        """Grava as linhas na fila (todas para `destino`) e acorda o envio. Retorna (novas, duplicadas)."""
+        agora = time.time()
+        novas = 0
+        with self._lock:
+            for linha in linhas:
+                linha = [str(v) for v in linha]
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO fila (chave, linha, criado_em, destino) VALUES (?, ?, ?, ?)",
+                    (chave_linha(linha), json.dumps(linha, ensure_ascii=False), agora, destino or ""))
+                novas += cur.rowcount
+            self._conn.commit()
+        if novas:
+            self.iniciar()
+            self._acordar.set()
+        return novas, len(linhas) - novas
+
+    def reenfileirar_falhas(self):
+        with self._lock:
+            n = self._conn.execute(
+                "UPDATE fila SET estado = 'pendente', tentativas = 0, proxima_em = 0 WHERE estado = 'falha'").rowcount
+            self._conn.commit()
+        if n:
+            self.iniciar()
+            self._acordar.set()
+        return n
+
+    # ---- envio ----
+    def _proximo_lote(self):
+        # linhas prontas do destino da linha pendente mais antiga
+        with self._lock:
+            agora = time.time()
+            primeira = self._conn.execute(
+                "SELECT destino FROM fila WHERE estado = 'pendente' AND proxima_em <= ? ORDER BY id LIMIT 1",
+                (agora,)).fetchone()
+            if primeira is None:
+                return None, []
+            return primeira[0], self._conn.execute(
+                "SELECT id, linha, tentativas FROM fila WHERE estado = 'pendente' AND proxima_em <= ? AND destino = ? ORDER BY id LIMIT ?",
+                (agora, primeira[0], self.lote_max)).fetchall()
+
+    def _espera_pendentes(self):
+        # segundos até a próxima linha pendente poder ser enviada (None = fila vazia)
+        with self._lock:
+            proxima = self._conn.execute("SELECT MIN(proxima_em) FROM fila WHERE estado = 'pendente'").fetchone()[0]
+        return None if proxima is None else max(0.0, proxima - time.time())
+
+    def drenar(self):
+        """Envia os lotes pendentes até a fila esvaziar ou um envio falhar. Retorna as linhas enviadas."""
+        enviadas = 0
+        while True:
+            destino, lote = self._proximo_lote()
+            if not lote:
+                return enviadas
+            ids = [i for i, _, _ in lote]
+            linhas = [json.loads(l) for _, l, _ in lote]
+            try:
+                if self.conferir is not None and any(tentativas for _, _, tentativas in lote):
+                    # reenvio: não duplica linhas que a tentativa anterior gravou apesar do erro
+                    gravadas = {_chave_conferencia(l) for l in self.conferir(destino, len(lote))}
+                    linhas = [l for l in linhas if _chave_conferencia(l) not in gravadas]
+                if linhas:
+                    self.enviar(linhas, destino)
+            except Exception as e:
+                self.ultimo_erro = str(e)
+                self._registrar_falha(lote, str(e))
+                return enviadas
+            agora = time.time()
+            with self._lock:
+                self._conn.executemany("UPDATE fila SET estado = 'enviada', enviado_em = ?, erro = NULL WHERE id = ?",
+                                       [(agora, i) for i in ids])
+                self._conn.commit()
+            self.ultimo_envio = agora
+            self.ultimo_erro = None
+            enviadas += len(ids)
+
+    def _registrar_falha(self, lote, erro):
+        agora = time.time()
+        atualizacoes = []
+        for i, _, tentativas in lote:
+            tentativas += 1
+            estado = "falha" if tentativas >= self.max_tentativas else "pendente"
+            espera = min(self.espera_maxima, self.espera_inicial * 2 ** (tentativas - 1))
+            atualizacoes.append((estado, tentativas, agora + espera, erro, i))
+        with self._lock:
+            self._conn.executemany("UPDATE fila SET estado = ?, tentativas = ?, proxima_em = ?, erro = ? WHERE id = ?",
+                                   atualizacoes)
+            self._conn.commit()
+
+    def _loop(self):
+        while True:
+            try:
+                self.drenar()
+            except Exception as e:
+                self.ultimo_erro = str(e)
+            espera = self._espera_pendentes()
+            self._acordar.wait(timeout=60.0 if espera is None else max(espera, 0.5))
+            self._acordar.clear()
+
+    def iniciar(self):
+        # inicia a thread de envio (só na primeira chamada)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="fila-escrita", daemon=True)
+                self._thread.start()
+
+    # ---- situação ----
+    def estado(self):
+        with self._lock:
+            contagens = dict(self._conn.execute("SELECT estado, COUNT(*) FROM fila GROUP BY estado").fetchall())
+        return {
+            "pendentes": contagens.get("pendente", 0),
+            "enviadas": contagens.get("enviada", 0),
+            "falhas": contagens.get("falha", 0),
+            "ultimo_envio": self.ultimo_envio,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+_fila = None
+_fila_lock = threading.Lock()
+_ouvintes = []
+
+def ao_enviar(funcao):
+    """Registra funcao(nome da fonte), chamada depois de cada lote gravado (ex.: o cache da
+    carga, para mostrar as linhas sem esperar o TTL da fonte)."""
+    with _fila_lock:
+        if funcao not in _ouvintes:
+            _ouvintes.append(funcao)
+
+def get_fila(caminho=CAMINHO_PADRAO, fontes=None):
+    """Fila única do processo, enviando pelo cliente compartilhado de planilha.py.
+
+    fontes: lista de planilha.Fonte (padrão: só a planilha principal); o destino de cada linha
+    é o nome de uma delas, e destino vazio ou desconhecido vai para a fonte ativa.
+    """
+    global _fila
+    with _fila_lock:
+        if _fila is None:
+            import gspread
+            from planilha import fonte_ativa, fontes_configuradas, get_acesso
+            por_nome = {f.nome: f for f in fontes or fontes_configuradas()}
+            ativa = fonte_ativa(list(por_nome.values()))
+            ultima_col = gspread.utils.rowcol_to_a1(1, len(COLUNAS_PLANILHA)).rstrip("0123456789")
+
+            def enviar(linhas, destino):
+                fonte = por_nome.get(destino, ativa)
+                # append não é idempotente: 5xx não é repetido aqui, e sim pela fila, que confere antes
+                get_acesso().executar("append_rows", linhas, value_input_option="USER_ENTERED", idempotente=False,
+                                      planilha=fonte.planilha, aba=fonte.aba)
+                for ouvinte in list(_ouvintes):
+                    ouvinte(fonte.nome)
+
+            def conferir(destino, n):
+                fonte = por_nome.get(destino, ativa)
+                acesso = get_acesso()
+                total = len(acesso.executar("get_values", "A:A", planilha=fonte.planilha, aba=fonte.aba))
+                inicio = max(2, total - n - CAUDA_CONFERENCIA + 1)
+                return acesso.executar("get_values", f"A{inicio}:{ultima_col}", planilha=fonte.planilha, aba=fonte.aba)
+            _fila = FilaEscrita(enviar, caminho, conferir=conferir)
+            # linhas que ficaram pendentes de uma execução anterior
+            _fila.iniciar()
+        return _fila
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from metricas import medir
+
+# --------------------------
+# Índices de filtro (montados uma vez por carga de dados)
+# --------------------------
+# Cada índice categórico guarda o código de cada valor (em minúsculas) e as posições das
+# linhas agrupadas por código; o índice de datas guarda as posições ordenadas por data.
+# Assim um filtro vira uma busca de código / searchsorted em vez de varrer a tabela.
+
+def _indice_categorico(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype) and not serie.isna().any():
+        # coluna categórica: basta colocar em minúsculas as categorias e remapear os códigos
+        codigos_cat, valores = pd.factorize(serie.cat.categories.astype(str).str.lower())
+        codigos = codigos_cat[serie.cat.codes.to_numpy()]
+    else:
+        codigos, valores = pd.factorize(serie.astype(str).str.lower())
+    ordem = np.argsort(codigos, kind="stable")
+    inicios = np.zeros(len(valores) + 1, dtype=np.int64)
+    inicios[1:] = np.cumsum(np.bincount(codigos, minlength=len(valores)))
+    return {
+        "codigos": {v: i for i, v in enumerate(valores)},
+        "ordem": ordem,
+        "inicios": inicios,
+        "opcoes": sorted(serie.dropna().astype(str).unique()),
+    }
+
+def _indice_datas(serie):
+    valores = pd.to_datetime(serie, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    validos = np.flatnonzero(~np.isnat(valores))
+    ordem = validos[np.argsort(valores[validos], kind="stable")]
+    return {"ordem": ordem, "valores": valores[ordem]}
+
+def build_filter_index(tabela, col_seg=None, col_integr=None, col_tipo=None, col_parsed=None):
+    indice = {"n": len(tabela), "campos": {}, "datas": None}
+    for campo, col in [("segurado", col_seg), ("integracao", col_integr), ("tipo_evento", col_tipo)]:
+        if col:
+            indice["campos"][campo] = _indice_categorico(tabela[col])
+    if col_parsed:
+        indice["datas"] = _indice_datas(tabela[col_parsed])
+    return indice
+
+def opcoes(indice, campo):
+    cat = indice["campos"].get(campo)
+    return cat["opcoes"] if cat else []
+
+def posicoes_valor(indice, campo, valor):
+    # posições (em ordem crescente) das linhas cujo campo é igual a valor, sem diferenciar maiúsculas
+    cat = indice["campos"][campo]
+    codigo = cat["codigos"].get(str(valor).lower())
+    if codigo is None:
+        return np.empty(0, dtype=np.int64)
+    return cat["ordem"][cat["inicios"][codigo]:cat["inicios"][codigo + 1]]
+
+def posicoes_periodo(indice, inicio=None, fim=None):
+    # posições das linhas com data em [inicio, fim]; datas vazias nunca entram
+    datas = indice["datas"]
+    lo = 0 if inicio is None else np.searchsorted(datas["valores"], np.datetime64(pd.Timestamp(inicio), "ns"), "left")
+    hi = len(datas["valores"]) if fim is None else np.searchsorted(datas["valores"], np.datetime64(pd.Timestamp(fim), "ns"), "right")
+    return np.sort(datas["ordem"][lo:hi])
+
+def intervalo_datas(indice):
+    datas = indice["datas"]
+    if datas is None or len(datas["valores"]) == 0:
+        return pd.NaT, pd.NaT
+    return pd.Timestamp(datas["valores"][0]), pd.Timestamp(datas["valores"][-1])
+
+def filtrar_posicoes(indice, segurado=None, integracao=None, tipo_evento=None, inicio=None, fim=None):
+    """Combina os filtros ativos e retorna as posições das linhas selecionadas.
+
+    Retorna None quando nenhum filtro está ativo (tabela inteira).
+    """
+    conjuntos = []
+    for campo, valor in [("segurado", segurado), ("integracao", integracao), ("tipo_evento", tipo_evento)]:
+        if valor and campo in indice["campos"]:
+            with medir(f"filtro_{campo}") as m:
+                conjuntos.append(posicoes_valor(indice, campo, valor))
+                m["linhas"] = len(conjuntos[-1])
+    if (inicio is not None or fim is not None) and indice["datas"] is not None:
+        with medir("filtro_periodo") as m:
+            conjuntos.append(posicoes_periodo(indice, inicio, fim))
+            m["linhas"] = len(conjuntos[-1])
+    if not conjuntos:
+        return None
+    conjuntos.sort(key=len)
+    pos = conjuntos[0]
+    with medir("filtro_combinacao") as m:
+        for outro in conjuntos[1:]:
+            if len(pos) == 0:
+                break
+            pos = np.intersect1d(pos, outro, assume_unique=True)
+        m["linhas"] = len(pos)
+    return pos
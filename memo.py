@@ -0,0 +1,44 @@
+import threading
+from collections import OrderedDict
+
+# --------------------------
+# Cache LRU limitado, ligado à versão dos dados
+# --------------------------
+class CacheLRU:
+    """Guarda até `maximo` resultados; tudo é descartado quando a versão dos dados muda."""
+
+    def __init__(self, maximo=64):
+        self.maximo = maximo
+        self.versao = None
+        self.acertos = 0
+        self.falhas = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, versao, chave, calcular):
+        with self._lock:
+            if versao != self.versao:
+                self._itens.clear()
+                self.versao = versao
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave]
+            self.falhas += 1
+        # calcula fora do lock: outras sessões não esperam por este cálculo
+        valor = calcular()
+        with self._lock:
+            if versao == self.versao:
+                self._itens[chave] = valor
+                self._itens.move_to_end(chave)
+                while len(self._itens) > self.maximo:
+                    self._itens.popitem(last=False)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.versao = None
+
+    def __len__(self):
+        return len(self._itens)
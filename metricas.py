@@ -0,0 +1,124 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --------------------------
+# Tempos por etapa (por execução do script)
+# --------------------------
+# Cada execução (rerun) de uma página chama `iniciar()` no topo; `medir(...)` e o decorador
+# `cronometrado(...)` registram etapa, tempo e linhas processadas na execução atual (sem
+# execução ativa, como em threads de fundo, só somam nos totais do processo). Cada registro
+# guarda o nível de aninhamento (0 = etapa de fora; etapas medidas dentro de outra somam no
+# tempo dela, então o total da execução soma só o nível 0). Em `finalizar()`
+# a execução pode ser gravada em um log JSON (uma linha por execução) e os totais do processo
+# em um arquivo no formato texto do Prometheus (para o textfile collector do node_exporter).
+
+_local = threading.local()
+_totais = {}
+_totais_lock = threading.Lock()
+
+def iniciar(pagina):
+    _local.execucao = {"pagina": pagina, "inicio": time.time(), "etapas": []}
+
+def _somar(etapa, segundos, linhas):
+    with _totais_lock:
+        total = _totais.setdefault(etapa, {"execucoes": 0, "segundos": 0.0, "linhas": 0})
+        total["execucoes"] += 1
+        total["segundos"] += segundos
+        total["linhas"] += linhas or 0
+
+@contextmanager
+def medir(etapa, linhas=None):
+    """Mede o bloco; o dict devolvido aceita `["linhas"] = n` quando o total só é conhecido no fim."""
+    info = {"linhas": linhas}
+    nivel = getattr(_local, "nivel", 0)
+    # registrado já no início: a etapa de fora aparece antes das que ela contém
+    registro = {"etapa": etapa, "segundos": 0.0, "linhas": linhas, "nivel": nivel}
+    execucao = getattr(_local, "execucao", None)
+    if execucao is not None:
+        execucao["etapas"].append(registro)
+    _local.nivel = nivel + 1
+    inicio = time.perf_counter()
+    try:
+        yield info
+    finally:
+        _local.nivel = nivel
+        registro["segundos"], registro["linhas"] = time.perf_counter() - inicio, info["linhas"]
+        _somar(etapa, registro["segundos"], registro["linhas"])
+
+def cronometrado(etapa=None, linhas=None):
+    """Decorador de `medir`; `linhas(resultado)` informa quantas linhas a chamada processou."""
+    def decorador(funcao):
+        nome = etapa or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with medir(nome) as info:
+                resultado = funcao(*args, **kwargs)
+                if linhas is not None:
+                    info["linhas"] = linhas(resultado)
+                return resultado
+        return envolvida
+    return decorador
+
+def totais():
+    with _totais_lock:
+        return {etapa: dict(valores) for etapa, valores in _totais.items()}
+
+def _gravar_atomico(caminho, texto):
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(temporario, caminho)
+
+def texto_prometheus(prefixo="consulta_interacoes"):
+    linhas = []
+    for sufixo, campo, tipo, ajuda in [
+        ("etapa_execucoes_total", "execucoes", "counter", "Execuções de cada etapa"),
+        ("etapa_segundos_total", "segundos", "counter", "Tempo acumulado de cada etapa, em segundos"),
+        ("etapa_linhas_total", "linhas", "counter", "Linhas processadas por cada etapa"),
+    ]:
+        linhas.append(f"# HELP {prefixo}_{sufixo} {ajuda}")
+        linhas.append(f"# TYPE {prefixo}_{sufixo} {tipo}")
+        for etapa, valores in sorted(totais().items()):
+            rotulo = etapa.replace("\\", "\\\\").replace('"', '\\"')
+            linhas.append(f'{prefixo}_{sufixo}{{etapa="{rotulo}"}} {valores[campo]}')
+    return "\n".join(linhas) + "\n"
+
+def finalizar(log_path=None, prometheus_path=None):
+    """Fecha a execução atual; grava o log JSON e o arquivo Prometheus quando configurados."""
+    execucao = getattr(_local, "execucao", None)
+    if execucao is None:
+        return []
+    _local.execucao = None
+    execucao["segundos"] = time.time() - execucao["inicio"]
+    try:
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(execucao, ensure_ascii=False) + "\n")
+        if prometheus_path:
+            _gravar_atomico(prometheus_path, texto_prometheus())
+    except OSError:
+        # métricas não podem derrubar a página
+        pass
+    return execucao["etapas"]
+
+def mostrar_painel(etapas, container):
+    """Tabela de tempos da execução (ex.: container = st.sidebar)."""
+    import pandas as pd
+    painel = container.expander("⏱️ Tempos desta execução", expanded=True)
+    if not etapas:
+        painel.caption("Nenhuma etapa medida.")
+        return
+    tabela = pd.DataFrame(etapas)
+    tabela["ms"] = (tabela.pop("segundos") * 1000).round(1)
+    tabela["linhas"] = tabela["linhas"].astype("Int64")
+    # etapas internas recuadas sob a etapa que as contém
+    tabela["etapa"] = ["\u2003" * nivel + etapa for etapa, nivel in zip(tabela["etapa"], tabela["nivel"])]
+    painel.dataframe(tabela[["etapa", "ms", "linhas"]], hide_index=True, use_container_width=True)
+    painel.caption(f"Total medido: {tabela.loc[tabela['nivel'] == 0, 'ms'].sum():.0f} ms")
@@ -1,131 +1,233 @@
+import time
+_inicio_pagina = time.perf_counter()
 import streamlit as st
-import email
-from email import policy
-from email.parser import BytesParser
-import re
 from datetime import datetime
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
-from transformers import pipeline
-import json   # <-- IMPORTANTE para converter string em dict
+from emails import contar_mensagens, extrair_nome_segurado, iterar_mensagens, ler_eml, ler_mensagens
+from cache_resumos import CAMINHO_PADRAO, MAX_ENTRADAS_PADRAO, CacheResumos
+import metricas
+from metricas import cronometrado, medir
+from fila_escrita import CAMINHO_PADRAO as CAMINHO_FILA, COLUNAS_PLANILHA, get_fila
+from planilha import fonte_destino, fontes_configuradas, get_acesso
+from resumo import BATCH_SIZE_PADRAO, MODELO_PADRAO, get_carregador, resumir_lote
 
 st.set_page_config(page_title="Importar E-mail", layout="centered")
+metricas.iniciar("importar_email")
 
 st.title("📩 Importador de E-mail (.eml) — Alimentar Planilha")
+tempo_primeira_renderizacao = time.perf_counter() - _inicio_pagina
 
 # -------------------------
-# Ler .eml
+# Resumir conteúdo com IA local (Transformers otimizado)
 # -------------------------
-def ler_eml(file):
-    raw = file.read()
-    msg = BytesParser(policy=policy.default).parsebytes(raw)
-
-    subject = msg.get("Subject", "")
-    date_str = msg.get("Date")
-
+def _config(chave, padrao):
+    # lê uma opção de st.secrets sem quebrar quando não há secrets configurados
     try:
-        dt = email.utils.parsedate_to_datetime(date_str)
-    except:
-        dt = datetime.now()
-
-    if msg.is_multipart():
-        parts = []
-        for part in msg.walk():
-            if part.get_content_type() == "text/plain":
-                try:
-                    parts.append(part.get_content())
-                except:
-                    pass
-        body = "\n".join(parts).strip()
-    else:
-        try:
-            body = msg.get_content().strip()
-        except:
-            body = ""
+        return st.secrets.get(chave, padrao)
+    except Exception:
+        return padrao
+
+RESUMO_BATCH_SIZE = int(_config("resumo_batch_size", BATCH_SIZE_PADRAO))
+RESUMO_TORCH_THREADS = int(_config("resumo_torch_threads", 0))
+RESUMO_MODELO = _config("resumo_modelo", MODELO_PADRAO)
+RESUMO_BACKEND = _config("resumo_backend", "torch")  # "torch", "torch-int8" ou "onnx"
+RESUMO_CACHE_PATH = _config("resumo_cache_path", CAMINHO_PADRAO)
+RESUMO_CACHE_MAX = int(_config("resumo_cache_max_entradas", MAX_ENTRADAS_PADRAO))
+DEBUG_TEMPOS = bool(_config("debug_tempos", False))
+
+# torch/transformers só são importados pelo carregador, em segundo plano; a página renderiza antes
+carregador = get_carregador(RESUMO_MODELO, RESUMO_BACKEND, RESUMO_TORCH_THREADS)
+carregador.aquecer()
 
-    return subject, dt, body
+def get_summarizer():
+    with st.spinner("Carregando modelo de resumo..."):
+        return carregador.obter()
+
+@st.cache_resource
+def get_cache_resumos():
+    # cache em disco compartilhado entre sessões; contadores valem para o processo
+    return CacheResumos(RESUMO_CACHE_PATH, RESUMO_CACHE_MAX)
+
+@cronometrado("resumir_varios", linhas=len)
+def resumir_varios(corpos):
+    resumos = resumir_lote(corpos, get_summarizer, batch_size=RESUMO_BATCH_SIZE,
+                           cache=get_cache_resumos(), modelo=carregador.id_modelo)
+    carregador.registrar_resumo()
+    return resumos
+
+@cronometrado("resumir_conteudo", linhas=lambda _: 1)
+def resumir_conteudo(body):
+    return resumir_varios([body])[0]
+
+def mostrar_tempos():
+    # fecha as medições desta execução (log/Prometheus, se configurados) e mostra o painel de debug
+    etapas = metricas.finalizar(_config("metricas_log_path", ""), _config("metricas_prometheus_path", ""))
+    if st.sidebar.checkbox("⏱️ Mostrar tempos", value=DEBUG_TEMPOS):
+        metricas.mostrar_painel(etapas, st.sidebar)
+
+def mostrar_status_cache():
+    cache = get_cache_resumos()
+    st.caption(f"🗄️ Cache de resumos: {cache.acertos} acerto(s), {cache.falhas} falha(s), {cache.tamanho()} resumo(s) guardado(s)")
+    tempos = [f"primeira renderização {tempo_primeira_renderizacao:.2f}s"]
+    if "carga_modelo" in carregador.tempos:
+        tempos.append(f"carga do modelo ({carregador.backend}) {carregador.tempos['carga_modelo']:.1f}s")
+    if "primeiro_resumo" in carregador.tempos:
+        tempos.append(f"primeiro resumo {carregador.tempos['primeiro_resumo']:.1f}s após o início")
+    st.caption("⏱️ " + " · ".join(tempos))
+    if carregador.erro:
+        st.caption(f"⚠️ {carregador.erro}")
 
 
 # -------------------------
-# Extrair nome do segurado
+# Conectar Google Sheets
 # -------------------------
-def extrair_nome_segurado(assunto):
-    padrao = r"\|\s*(.*?)\s*-\s*\d"
-    m = re.search(padrao, assunto)
-    if m:
-        return m.group(1).strip()
-
-    padrao2 = r"-\s*\d+\s*-\s*(.*)"
-    m2 = re.search(padrao2, assunto)
-    if m2:
-        nome = m2.group(1).strip()
-        nome = re.sub(r"\d{11,14}", "", nome).strip()
-        return nome
-
-    if "|" in assunto:
-        return assunto.split("|")[-1].strip()
-
-    return assunto.strip()
+# cliente compartilhado com o painel (planilha.py): autoriza uma vez por processo e refaz em 429/5xx.
+# As linhas não são gravadas direto: vão para a fila local (fila_escrita.py), que envia em lote
+# em segundo plano, descarta repetidas e reenvia o que falhar.
+# com o log dividido em várias planilhas/abas, cada linha vai para a fonte do seu ano (ou a ativa)
+FONTES = fontes_configuradas(_config("planilhas", []))
+FILA_PATH = _config("fila_escrita_path", CAMINHO_FILA)
+fila = get_fila(FILA_PATH, FONTES)
+
+def mostrar_status_api():
+    stats = get_acesso().estatisticas()
+    st.caption(f"📡 API Sheets (processo): {stats['chamadas']} chamada(s) · {stats['segundos']:.1f}s · {stats['retentativas']} retentativa(s)")
+
+def enviar_para_fila(linhas):
+    por_destino = {}
+    for linha in linhas:
+        destino = fonte_destino(FONTES, linha[COLUNAS_PLANILHA.index("data_hora")]).nome
+        por_destino.setdefault(destino, []).append(linha)
+    novas = duplicadas = 0
+    for destino, grupo in por_destino.items():
+        n, d = fila.enfileirar(grupo, destino)
+        novas, duplicadas = novas + n, duplicadas + d
+    if novas:
+        st.success(f"✔ {novas} linha(s) na fila de envio para a planilha.")
+    if duplicadas:
+        st.info(f"{duplicadas} linha(s) ignorada(s): mesma interação (segurado, data e conteúdo) já enviada ou na fila.")
+
+def mostrar_status_fila():
+    situacao = fila.estado()
+    texto = f"📤 Fila de envio: {situacao['pendentes']} pendente(s) · {situacao['enviadas']} enviada(s)"
+    if situacao["ultimo_envio"]:
+        texto += f" · último envio às {datetime.fromtimestamp(situacao['ultimo_envio']).strftime('%H:%M:%S')}"
+    st.caption(texto)
+    if situacao["ultimo_erro"]:
+        st.caption(f"⚠️ Último envio falhou (será repetido): {situacao['ultimo_erro']}")
+    if situacao["falhas"]:
+        st.warning(f"{situacao['falhas']} linha(s) não foram enviadas após várias tentativas.")
+        if st.button("Tentar enviar novamente"):
+            fila.reenfileirar_falhas()
+            st.rerun()
+    mostrar_status_api()
 
 
 # -------------------------
-# Resumir conteúdo com IA local (Transformers otimizado)
+# Importação em lote (.eml, .zip, .mbox)
 # -------------------------
-@st.cache_resource
-def get_summarizer():
-    # modelo menor e mais rápido
-    return pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
+TIPOS_EVENTO = ["Outros", "Inicio", "Cobrança", "Retorno", "Questionamento"]
+INTEGRACOES = ["RCV", "APP", "OUTRO"]
 
-def resumir_conteudo(body):
-    texto = body.strip()
-    if len(texto) == 0:
-        return "Informações recebidas por e-mail."
+# leitura das mensagens em paralelo (emails.py); 0 = nº de CPUs
+IMPORTACAO_PROCESSOS = int(_config("importacao_processos", 0)) or None
 
-    summarizer = get_summarizer()
-    texto = " ".join(texto.split())
-
-    # blocos menores para acelerar
-    max_chars = 1000
-    blocos = [texto[i:i+max_chars] for i in range(0, len(texto), max_chars)]
-
-    resumos = []
-    for b in blocos:
+def _mensagens_dos_arquivos(arquivos, erros):
+    # encadeia as mensagens de todos os uploads; arquivo ilegível (ex.: zip corrompido) vira erro
+    for arquivo in arquivos:
         try:
-            out = summarizer(b, max_length=40, min_length=15, do_sample=False)
-            resumos.append(out[0]["summary_text"])
+            yield from iterar_mensagens(arquivo)
+        except Exception as e:
+            erros.append(f"{arquivo.name}: {e}")
+
+def _total_mensagens(arquivos):
+    # total para o progresso da leitura; arquivo ilegível conta 0 (o erro aparece na leitura)
+    total = 0
+    for arquivo in arquivos:
+        try:
+            total += contar_mensagens(arquivo)
         except Exception:
-            resumos.append(b[:150] + ("..." if len(b) > 150 else ""))
-
-    texto_resumido = " ".join(resumos)
-
-    # Ajuste para casos frequentes
-    low = texto.lower()
-    if any(k in low for k in ["agenda", "reuni", "horário", "disponibilidade"]):
-        return "Enviado e-mail solicitando disponibilidade de horários para agendar reunião inicial."
-    if any(k in low for k in ["dúvida", "confirmar", "esclarecimento"]):
-        return "Enviado e-mail questionando se ficou dúvida sobre a integração ou documentação."
-
-    return texto_resumido
-
-
-# -------------------------
-# Conectar Google Sheets
-# -------------------------
-SHEET_ID = "1331BNS5F0lOsIT9fNDds4Jro_nMYvfeWGVeqGhgj_BE"
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive"
-]
-
-def append_to_sheet(linha):
-    # CORREÇÃO: transforma string JSON em dict
-    gcp_key = json.loads(st.secrets["gcp_key"])
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(gcp_key, scope)
-    client = gspread.authorize(creds)
-    sheet = client.open_by_key(SHEET_ID).sheet1
-    sheet.append_row(linha, value_input_option="USER_ENTERED")
-
+            arquivo.seek(0)
+    return total
+
+@cronometrado("montar_linhas_lote", linhas=lambda r: len(r[0]))
+def montar_linhas_lote(arquivos):
+    lidas = []
+    erros = []
+    progresso = st.progress(0.0, text="Lendo e-mails...")
+    total = max(_total_mensagens(arquivos), 1)
+    mensagens = _mensagens_dos_arquivos(arquivos, erros)
+    with medir("ler_mensagens") as info:
+        for n, resultado in enumerate(ler_mensagens(mensagens, IMPORTACAO_PROCESSOS), 1):
+            if "erro" in resultado:
+                erros.append(f"{resultado['nome']}: {resultado['erro']}")
+            else:
+                lidas.append(resultado)
+            if n % 50 == 0:
+                progresso.progress(min(n / total, 1.0), text=f"{n} de {total} e-mail(s) lido(s)")
+        info["linhas"] = len(lidas)
+
+    # os resultados chegam fora de ordem; a grade segue a ordem dos arquivos
+    lidas.sort(key=lambda r: r["ordem"])
+    corpos = [r["corpo"] for r in lidas]
+    linhas = [{
+        "enviar": True,
+        "segurado": r["segurado"],
+        "canal": "E-mail",
+        "data_hora": r["data_hora"].strftime("%d/%m/%Y %H:%M"),
+        "conteudo": "",
+        "tipo_evento": "Outros",
+        "integracao": "RCV",
+        "arquivo": r["nome"],
+    } for r in lidas]
+
+    # resumos em lote: várias chamadas de RESUMO_BATCH_SIZE blocos por vez ao modelo, com progresso
+    passo = max(RESUMO_BATCH_SIZE * 4, 1)
+    for i in range(0, len(corpos), passo):
+        progresso.progress(i / len(corpos), text=f"Resumindo e-mails ({i}/{len(corpos)})...")
+        resumos = resumir_varios(corpos[i:i + passo])
+        for linha, resumo in zip(linhas[i:i + passo], resumos):
+            linha["conteudo"] = resumo
+    progresso.empty()
+    return pd.DataFrame(linhas, columns=["enviar"] + COLUNAS_PLANILHA + ["arquivo"]), erros
+
+modo = st.radio("Modo de importação:", ["Arquivo único", "Lote (.eml / .zip / .mbox)"], horizontal=True)
+
+if modo != "Arquivo único":
+    arquivos = st.file_uploader("Envie arquivos .eml, .zip ou .mbox", type=["eml", "zip", "mbox"], accept_multiple_files=True)
+    if arquivos:
+        # só reprocessa quando o conjunto de arquivos muda (editar a grade não refaz os resumos)
+        chave = tuple((a.name, a.size) for a in arquivos)
+        if st.session_state.get("lote_chave") != chave:
+            st.session_state["lote_df"], st.session_state["lote_erros"] = montar_linhas_lote(arquivos)
+            st.session_state["lote_chave"] = chave
+
+        mostrar_status_cache()
+        for erro in st.session_state["lote_erros"]:
+            st.warning(f"Arquivo ignorado — {erro}")
+
+        st.subheader("✏️ Revisar linhas antes de enviar")
+        editado = st.data_editor(
+            st.session_state["lote_df"],
+            column_config={
+                "enviar": st.column_config.CheckboxColumn("Enviar"),
+                "conteudo": st.column_config.TextColumn("conteudo", width="large"),
+                "tipo_evento": st.column_config.SelectboxColumn("tipo_evento", options=TIPOS_EVENTO),
+                "integracao": st.column_config.SelectboxColumn("integracao", options=INTEGRACOES),
+                "arquivo": st.column_config.TextColumn("arquivo", disabled=True),
+            },
+            hide_index=True,
+            use_container_width=True,
+            key="lote_editor",
+        )
+        aceitas = editado[editado["enviar"]]
+        st.write(f"{len(aceitas)} de {len(editado)} linha(s) selecionada(s) para envio.")
+
+        if st.button("Enviar lote para planilha", disabled=aceitas.empty):
+            enviar_para_fila(aceitas[COLUNAS_PLANILHA].astype(str).values.tolist())
+        mostrar_status_fila()
+    mostrar_tempos()
+    st.stop()
 
 # -------------------------
 # Upload EML
@@ -154,6 +256,8 @@ if uploaded:
     # gera resumo automático otimizado
     conteudo_resumido = resumir_conteudo(corpo)
 
+    mostrar_status_cache()
+
     st.subheader("✏️ Ajustar conteúdo antes de enviar")
     conteudo_editado = st.text_area(
         "Conteúdo resumido (pode editar):",
@@ -161,8 +265,8 @@ if uploaded:
         height=150
     )
 
-    tipo_evento = st.selectbox("Tipo do evento:", ["Outros", "Inicio", "Cobrança", "Retorno", "Questionamento"])
-    integracao = st.selectbox("Integração:", ["RCV", "APP", "OUTRO"])
+    tipo_evento = st.selectbox("Tipo do evento:", TIPOS_EVENTO)
+    integracao = st.selectbox("Integração:", INTEGRACOES)
 
     st.subheader("📄 Linha final que será enviada")
     df = pd.DataFrame([{
@@ -176,12 +280,14 @@ if uploaded:
     st.table(df)
 
     if st.button("Enviar para planilha"):
-        append_to_sheet([
+        enviar_para_fila([[
             segurado,
             canal,
             dt_fmt,
             conteudo_editado,
             tipo_evento,
             integracao
-        ])
-        st.success("✔ Linha enviada para a planilha com sucesso!")
+        ]])
+    mostrar_status_fila()
+
+mostrar_tempos()
@@ -0,0 +1,178 @@
+import json
+import random
+import threading
+import time
+from collections import namedtuple
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+
+# --------------------------
+# Acesso compartilhado ao Google Sheets
+# --------------------------
+# Um cliente gspread por processo, usado por todas as páginas e sessões: as credenciais e a
+# autorização são feitas uma vez, os handles de worksheet ficam em cache e cada chamada à API
+# passa por `executar`, que conta chamadas/tempo e refaz com backoff exponencial em 429/5xx.
+# Em 401 (token expirado/revogado) o cliente é recriado e a chamada repetida. Operações não
+# idempotentes (append) não são repetidas em 5xx: o servidor pode ter gravado antes de falhar.
+
+SHEET_ID = "1331BNS5F0lOsIT9fNDds4Jro_nMYvfeWGVeqGhgj_BE"  # ajuste se necessário
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+# --------------------------
+# Fontes (planilhas/abas) do log de interações
+# --------------------------
+# O log pode ser dividido em várias planilhas ou abas (ex.: uma por ano ou por equipe), todas
+# com o mesmo cabeçalho. Cada fonte tem um nome (vai para a coluna "fonte" do painel), o id da
+# planilha, a aba (None = primeira) e se é a fonte ativa, que recebe as linhas novas e é a única
+# relida a cada recarga. `ano` (opcional) manda para a fonte as interações daquele ano.
+# Configuração em st.secrets, por exemplo:
+#   [[planilhas]]
+#   nome = "2024"
+#   planilha = "1abc..."
+#   ano = 2024
+#   [[planilhas]]
+#   nome = "2025"
+#   planilha = "1def..."
+#   aba = "Interações"
+#   ativa = true
+# Mantenha a fonte ativa por último: assim as linhas novas entram no fim da tabela unida e o
+# painel atualiza resumos e índices de forma incremental.
+Fonte = namedtuple("Fonte", ["nome", "planilha", "aba", "ativa", "ano"], defaults=(SHEET_ID, None, False, None))
+
+def fontes_configuradas(config=None):
+    """Lista de Fonte a partir da lista de dicts da configuração; sem configuração, só a planilha padrão."""
+    if not config:
+        return [Fonte("principal", ativa=True)]
+    fontes = [Fonte(**{campo: valor for campo, valor in dict(item).items() if campo in Fonte._fields})
+              for item in config]
+    if len({f.nome for f in fontes}) != len(fontes):
+        raise ValueError("Os nomes das planilhas configuradas devem ser únicos.")
+    if not any(f.ativa for f in fontes):
+        # nenhuma marcada: a última é a ativa
+        fontes[-1] = fontes[-1]._replace(ativa=True)
+    return fontes
+
+def fonte_ativa(fontes):
+    return [f for f in fontes if f.ativa][-1]
+
+def fonte_destino(fontes, data_hora):
+    """Fonte que recebe uma linha nova: a do ano da interação, se houver; senão a ativa."""
+    anos = {int(f.ano): f for f in fontes if f.ano is not None}
+    if anos:
+        import pandas as pd
+        from datas import parse_date_value
+        data = parse_date_value(data_hora)
+        if pd.notna(data) and data.year in anos:
+            return anos[data.year]
+    return fonte_ativa(fontes)
+
+def fabrica_service_account(gcp_key):
+    """Fábrica de clientes a partir da chave da service account (dict ou string JSON)."""
+    def fabrica():
+        chave = json.loads(gcp_key) if isinstance(gcp_key, str) else dict(gcp_key)
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(chave, SCOPE)
+        return gspread.authorize(creds)
+    return fabrica
+
+def _status_http(erro):
+    resposta = getattr(erro, "response", None)
+    return getattr(resposta, "status_code", None)
+
+class AcessoPlanilha:
+    def __init__(self, fabrica_cliente, max_tentativas=5, espera_inicial=1.0, espera_maxima=32.0):
+        self.fabrica_cliente = fabrica_cliente
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self._cliente = None
+        self._worksheets = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"chamadas": 0, "segundos": 0.0, "retentativas": 0, "erros": 0, "autorizacoes": 0}
+
+    def _contar(self, **valores):
+        with self._stats_lock:
+            for chave, valor in valores.items():
+                self.stats[chave] += valor
+
+    def _renovar_cliente(self):
+        with self._lock:
+            self._cliente = None
+            self._worksheets.clear()
+
+    def worksheet(self, planilha=SHEET_ID, aba=None):
+        """Handle (em cache) da aba `aba` da planilha; None = primeira aba (sheet1)."""
+        chave = (planilha, aba)
+        with self._lock:
+            if chave in self._worksheets:
+                return self._worksheets[chave]
+            if self._cliente is None:
+                self._cliente = self.fabrica_cliente()
+                self._contar(autorizacoes=1)
+            cliente = self._cliente
+        # abre fora do lock: fontes diferentes (planilhas/abas) podem ser abertas em paralelo
+        inicio = time.perf_counter()
+        arquivo = cliente.open_by_key(planilha)
+        handle = arquivo.sheet1 if aba is None else arquivo.worksheet(aba)
+        self._contar(chamadas=1, segundos=time.perf_counter() - inicio)
+        with self._lock:
+            return self._worksheets.setdefault(chave, handle)
+
+    def executar(self, operacao, *args, planilha=SHEET_ID, aba=None, idempotente=True, **kwargs):
+        """Chama `worksheet.<operacao>(*args, **kwargs)` com contagem e retentativas.
+
+        idempotente=False (ex.: append_rows): 5xx é propagado sem repetir; 429 e 401 ainda são
+        repetidos, pois nesses casos a chamada não foi aplicada.
+        """
+        tentativa = 0
+        while True:
+            tentativa += 1
+            inicio = time.perf_counter()
+            chamou = False  # erro ao abrir a aba: a operação nem foi enviada
+            try:
+                metodo = getattr(self.worksheet(planilha, aba), operacao)
+                chamou = True
+                resultado = metodo(*args, **kwargs)
+                self._contar(chamadas=1, segundos=time.perf_counter() - inicio)
+                return resultado
+            except gspread.exceptions.APIError as e:
+                self._contar(chamadas=1, segundos=time.perf_counter() - inicio, erros=1)
+                status = _status_http(e)
+                if status == 401 and tentativa == 1:
+                    self._renovar_cliente()
+                elif (status not in STATUS_RETENTAVEIS or (chamou and not idempotente and status != 429)
+                      or tentativa >= self.max_tentativas):
+                    raise
+                else:
+                    espera = min(self.espera_maxima, self.espera_inicial * 2 ** (tentativa - 1))
+                    time.sleep(espera * random.uniform(0.5, 1.0))
+                self._contar(retentativas=1)
+
+    def estatisticas(self):
+        with self._stats_lock:
+            return dict(self.stats)
+
+_acesso = None
+_acesso_lock = threading.Lock()
+
+def _fabrica_padrao():
+    # lê a chave em st.secrets["gcp_key"] só quando o primeiro cliente é criado
+    import streamlit as st
+    return fabrica_service_account(st.secrets["gcp_key"])()
+
+def get_acesso():
+    """Instância única do processo (criada na primeira chamada)."""
+    global _acesso
+    with _acesso_lock:
+        if _acesso is None:
+            _acesso = AcessoPlanilha(_fabrica_padrao)
+        return _acesso
+
+def configurar_acesso(fabrica_cliente, **opcoes):
+    """Troca o acesso do processo (ex.: por um backend falso em testes e benchmarks)."""
+    global _acesso
+    with _acesso_lock:
+        _acesso = AcessoPlanilha(fabrica_cliente, **opcoes)
+        return _acesso
@@ -0,0 +1,101 @@
+import re
+import time
+
+# --------------------------
+# Backend falso do Google Sheets (em memória)
+# --------------------------
+# Imita a parte da API do gspread usada pelo app (open_by_key, sheet1/worksheet, row_values,
+# get_all_records, get_values, append_row(s)). Use com planilha.configurar_acesso(cliente.fabrica)
+# para testar ou medir o app sem rede. `falhas` injeta erros HTTP (ex.: [429, 503]) nas
+# próximas chamadas e `latencia` simula o tempo de ida e volta.
+
+def _numericise(valor):
+    if not isinstance(valor, str) or valor == "":
+        return valor
+    for conversor in (int, float):
+        try:
+            return conversor(valor)
+        except ValueError:
+            pass
+    return valor
+
+class _RespostaFake:
+    def __init__(self, status):
+        self.status_code = status
+        self.text = f"erro {status}"
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text, "status": "FAKE"}}
+
+class WorksheetFake:
+    def __init__(self, cliente, titulo, linhas):
+        self.cliente = cliente
+        self.title = titulo
+        self.linhas = [list(map(str, l)) for l in linhas]
+
+    def row_values(self, linha):
+        self.cliente._chamada()
+        valores = self.linhas[linha - 1] if linha <= len(self.linhas) else []
+        while valores and valores[-1] == "":
+            valores = valores[:-1]
+        return list(valores)
+
+    def get_all_records(self):
+        self.cliente._chamada()
+        if not self.linhas:
+            return []
+        cabecalho = self.linhas[0]
+        return [dict(zip(cabecalho, [_numericise(v) for v in l] + [""] * (len(cabecalho) - len(l))))
+                for l in self.linhas[1:]]
+
+    def get_values(self, intervalo=None):
+        self.cliente._chamada()
+        inicio = 1
+        m = re.match(r"[A-Z]+(\d+)", intervalo or "")
+        if m:
+            inicio = int(m.group(1))
+        return [list(l) for l in self.linhas[inicio - 1:]]
+
+    def append_row(self, valores, value_input_option=None):
+        self.cliente._chamada()
+        self.linhas.append([str(v) for v in valores])
+
+    def append_rows(self, linhas, value_input_option=None):
+        self.cliente._chamada()
+        self.linhas.extend([str(v) for v in l] for l in linhas)
+
+class ArquivoFake:
+    def __init__(self, cliente, abas):
+        self.abas = {titulo: WorksheetFake(cliente, titulo, linhas) for titulo, linhas in abas.items()}
+
+    @property
+    def sheet1(self):
+        return next(iter(self.abas.values()))
+
+    def worksheet(self, titulo):
+        return self.abas[titulo]
+
+class ClienteFake:
+    """planilhas: {sheet_id: {titulo_aba: [cabecalho, linha, ...]}}"""
+
+    def __init__(self, planilhas, latencia=0.0):
+        self.latencia = latencia
+        self.falhas = []
+        self.chamadas = 0
+        self.arquivos = {pid: ArquivoFake(self, abas) for pid, abas in planilhas.items()}
+
+    def fabrica(self):
+        # usado como fábrica de clientes em planilha.configurar_acesso
+        return self
+
+    def _chamada(self):
+        self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        if self.falhas:
+            import gspread
+            raise gspread.exceptions.APIError(_RespostaFake(self.falhas.pop(0)))
+
+    def open_by_key(self, chave):
+        self._chamada()
+        return self.arquivos[chave]
@@ -0,0 +1,221 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from cache_resumos import chave_resumo
+
+# -------------------------
+# Resumo de e-mails com IA local (Transformers)
+# -------------------------
+# Estágios: normaliza o corpo -> aplica os atalhos por palavra-chave (sem inferência) ->
+# divide o restante em blocos -> uma chamada em lote ao pipeline para todos os blocos de
+# todos os e-mails -> junta os resumos de cada e-mail.
+
+MODELO_PADRAO = "sshleifer/distilbart-cnn-12-6"  # modelo menor e mais rápido
+MAX_CHARS = 1000  # blocos menores para acelerar
+BATCH_SIZE_PADRAO = 8
+RESUMO_VAZIO = "Informações recebidas por e-mail."
+
+# Ajuste para casos frequentes: quando o texto tem alguma dessas palavras o resumo é fixo
+ATALHOS = [
+    (["agenda", "reuni", "horário", "disponibilidade"],
+     "Enviado e-mail solicitando disponibilidade de horários para agendar reunião inicial."),
+    (["dúvida", "confirmar", "esclarecimento"],
+     "Enviado e-mail questionando se ficou dúvida sobre a integração ou documentação."),
+]
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+# modelos exportados para ONNX ficam salvos aqui (a exportação só acontece na primeira vez)
+DIR_ONNX_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "onnx")
+
+def _carregar_onnx(modelo, dir_onnx):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+    destino = os.path.join(dir_onnx, re.sub(r"[^\w.-]+", "_", modelo))
+    if not os.path.exists(os.path.join(destino, "config.json")):
+        # exporta uma vez e grava em um diretório temporário, trocado de uma vez pelo definitivo
+        os.makedirs(dir_onnx, exist_ok=True)
+        temporario = tempfile.mkdtemp(dir=dir_onnx)
+        try:
+            ORTModelForSeq2SeqLM.from_pretrained(modelo, export=True).save_pretrained(temporario)
+            AutoTokenizer.from_pretrained(modelo).save_pretrained(temporario)
+            if not os.path.exists(destino):
+                os.replace(temporario, destino)
+        finally:
+            shutil.rmtree(temporario, ignore_errors=True)
+    return ORTModelForSeq2SeqLM.from_pretrained(destino), AutoTokenizer.from_pretrained(destino)
+
+def carregar_summarizer(modelo=MODELO_PADRAO, backend="torch", dir_onnx=DIR_ONNX_PADRAO):
+    """Carrega o pipeline de resumo; os imports pesados (torch/transformers) ficam aqui dentro.
+
+    backend: "torch" (padrão), "torch-int8" (quantização dinâmica das camadas Linear, CPU)
+    ou "onnx" (exportado via optimum[onnxruntime], dependência opcional, e salvo em `dir_onnx`).
+    """
+    from transformers import pipeline
+    if backend == "onnx":
+        modelo_onnx, tokenizer = _carregar_onnx(modelo, dir_onnx)
+        return pipeline("summarization", model=modelo_onnx, tokenizer=tokenizer)
+    summarizer = pipeline("summarization", model=modelo)
+    if backend == "torch-int8":
+        import torch
+        summarizer.model = torch.quantization.quantize_dynamic(summarizer.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return summarizer
+
+def configurar_threads(n):
+    # limita as threads de CPU usadas pelo torch (0/None mantém o padrão)
+    if n:
+        import torch
+        torch.set_num_threads(int(n))
+
+class CarregadorModelo:
+    """Carrega o summarizer em uma thread de fundo e guarda os tempos de carga/primeiro resumo."""
+
+    def __init__(self, modelo=MODELO_PADRAO, backend="torch", threads=0):
+        self.modelo = modelo
+        self.backend = backend if backend in BACKENDS else "torch"
+        self.threads = threads
+        self.erro = None
+        self.tempos = {}
+        self._summarizer = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def id_modelo(self):
+        # identifica modelo + backend (usado na chave do cache de resumos)
+        return self.modelo if self.backend == "torch" else f"{self.modelo}@{self.backend}"
+
+    def _carregar(self):
+        inicio = time.perf_counter()
+        configurar_threads(self.threads)
+        try:
+            self._summarizer = carregar_summarizer(self.modelo, self.backend)
+        except Exception as e:
+            if self.backend == "torch":
+                raise
+            # backend opcional indisponível (ex.: optimum não instalado): volta para o torch
+            self.erro = f"backend {self.backend} indisponível ({e}); usando torch"
+            self.backend = "torch"
+            self._summarizer = carregar_summarizer(self.modelo, "torch")
+        self.tempos["carga_modelo"] = time.perf_counter() - inicio
+
+    def aquecer(self):
+        # inicia a carga em segundo plano (só se não houver uma em andamento ou concluída)
+        with self._lock:
+            if self._thread is None:
+                self.tempos["inicio"] = time.perf_counter()
+                self._thread = threading.Thread(target=self._carregar_com_erro, name="carregar-summarizer", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def _carregar_com_erro(self):
+        try:
+            self._carregar()
+        except Exception as e:
+            self.erro = str(e)
+            # falha (ex.: erro temporário no download do modelo): a próxima chamada tenta de novo
+            with self._lock:
+                self._thread = None
+
+    def pronto(self):
+        return self._summarizer is not None
+
+    def obter(self):
+        self.aquecer().join()
+        if self._summarizer is None:
+            raise RuntimeError(f"Falha ao carregar o modelo de resumo: {self.erro}")
+        return self._summarizer
+
+    def registrar_resumo(self):
+        if "primeiro_resumo" not in self.tempos and self.pronto():
+            self.tempos["primeiro_resumo"] = time.perf_counter() - self.tempos["inicio"]
+
+_carregadores = {}
+_carregadores_lock = threading.Lock()
+
+def get_carregador(modelo=MODELO_PADRAO, backend="torch", threads=0):
+    # um carregador por processo e configuração, compartilhado entre páginas e sessões
+    with _carregadores_lock:
+        chave = (modelo, backend, int(threads or 0))
+        if chave not in _carregadores:
+            _carregadores[chave] = CarregadorModelo(modelo, backend, threads)
+        return _carregadores[chave]
+
+def normalizar(body):
+    return " ".join(str(body).strip().split())
+
+def resumo_por_atalho(texto):
+    low = texto.lower()
+    for palavras, resumo in ATALHOS:
+        if any(k in low for k in palavras):
+            return resumo
+    return None
+
+def dividir_blocos(texto, max_chars=MAX_CHARS):
+    return [texto[i:i+max_chars] for i in range(0, len(texto), max_chars)]
+
+def _resumo_fallback(bloco):
+    return bloco[:150] + ("..." if len(bloco) > 150 else "")
+
+def _inferir(summarizer, blocos, batch_size):
+    try:
+        out = summarizer(blocos, max_length=40, min_length=15, do_sample=False, batch_size=batch_size)
+        return [o["summary_text"] for o in out]
+    except Exception:
+        # se o lote falhar, resume bloco a bloco para isolar o bloco com problema
+        resumos = []
+        for b in blocos:
+            try:
+                out = summarizer(b, max_length=40, min_length=15, do_sample=False)
+                resumos.append(out[0]["summary_text"])
+            except Exception:
+                resumos.append(_resumo_fallback(b))
+        return resumos
+
+def resumir_lote(corpos, get_summarizer, batch_size=BATCH_SIZE_PADRAO, cache=None, modelo=MODELO_PADRAO):
+    """Resume vários corpos de e-mail com uma única chamada em lote ao modelo.
+
+    `get_summarizer` só é chamado se algum e-mail realmente precisar de inferência.
+    Com `cache` (CacheResumos), resumos já calculados para o mesmo texto/modelo são reaproveitados.
+    """
+    resultados = [None] * len(corpos)
+    pendentes = {}
+    for i, body in enumerate(corpos):
+        texto = normalizar(body)
+        if len(texto) == 0:
+            resultados[i] = RESUMO_VAZIO
+            continue
+        atalho = resumo_por_atalho(texto)
+        if atalho:
+            resultados[i] = atalho
+            continue
+        pendentes[i] = texto
+
+    chaves = {}
+    if cache is not None and pendentes:
+        chaves = {i: chave_resumo(texto, modelo) for i, texto in pendentes.items()}
+        encontrados = cache.buscar_varios(list(chaves.values()))
+        for i in list(pendentes):
+            if chaves[i] in encontrados:
+                resultados[i] = encontrados[chaves[i]]
+                del pendentes[i]
+
+    blocos = []
+    donos = []
+    for i, texto in pendentes.items():
+        for b in dividir_blocos(texto):
+            blocos.append(b)
+            donos.append(i)
+
+    if blocos:
+        resumos = _inferir(get_summarizer(), blocos, batch_size)
+        partes = {}
+        for i, r in zip(donos, resumos):
+            partes.setdefault(i, []).append(r)
+        for i, rs in partes.items():
+            resultados[i] = " ".join(rs)
+        if cache is not None:
+            cache.gravar_varios({chaves[i]: resultados[i] for i in partes})
+    return resultados
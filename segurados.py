@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from consultas import COLUNAS_EXIBICAO, contagem
+from status import interpretar_status
+from tabela import COLUNA_DATA
+
+# --------------------------
+# Resumo por segurado
+# --------------------------
+# Para cada segurado (sem diferenciar maiúsculas, como o filtro): total de interações,
+# primeira e última data, canal mais usado, status das três interações mais recentes e as
+# posições das suas linhas ordenadas da mais recente para a mais antiga (sem data por último).
+# Montado na carga, um objeto por versão dos dados (nunca alterado depois de pronto: sessões
+# ainda na versão anterior seguem consultando o seu); quando a planilha só ganhou linhas no
+# fim, a versão nova reaproveita a anterior e recalcula só os segurados dessas linhas.
+# Consultar um cliente custa O(linhas do cliente).
+
+_NAT = np.iinfo(np.int64).min
+
+def _codigos(tabela, inicio=0):
+    # código inteiro por linha (a partir de `inicio`) e o segurado em minúsculas de cada código
+    serie = tabela.coluna("segurado").iloc[inicio:]
+    codigos_cat, chaves = pd.factorize(serie.cat.categories.astype(str).str.lower())
+    return codigos_cat[serie.cat.codes.to_numpy()], np.asarray(chaves, dtype=object)
+
+def _ordem_recentes(datas, posicoes):
+    # data decrescente, sem data por último; empates pela posição na planilha
+    chave = datas[posicoes]
+    chave = np.where(chave == _NAT, _NAT + 1, chave)
+    return posicoes[np.lexsort((posicoes, -chave))]
+
+class ResumoSegurados:
+    def __init__(self):
+        self.versao = None
+        self.linhas = 0
+        self.entradas = {}
+
+    def atualizar(self, tabela, versao, delta=None):
+        """Resumo da versão `versao` da tabela, em um objeto novo (este não é alterado).
+
+        delta=(versão anterior, nº de linhas anteriores) indica que a tabela só ganhou linhas
+        no fim; se este resumo estiver exatamente nessa versão, recalcula só os segurados novos.
+        """
+        if versao == self.versao:
+            return self
+        novo = ResumoSegurados()
+        if delta is not None and tuple(delta) == (self.versao, self.linhas) and len(tabela) >= self.linhas:
+            novo.entradas = dict(self.entradas)
+            novo._acrescentar(tabela, self.linhas)
+        else:
+            novo._montar(tabela)
+        novo.versao, novo.linhas = versao, len(tabela)
+        return novo
+
+    def _montar(self, tabela):
+        datas = tabela.coluna(COLUNA_DATA).to_numpy(dtype="datetime64[ns]").view("i8")
+        codigos, chaves = _codigos(tabela)
+        chave_data = np.where(datas == _NAT, _NAT + 1, datas)
+        # lexsort é estável: empates de data ficam na ordem da planilha
+        ordem = np.lexsort((-chave_data, codigos))
+        limites = np.flatnonzero(np.diff(codigos[ordem])) + 1
+        grupos = dict(zip(chaves[np.unique(codigos)], np.split(ordem, limites))) if len(ordem) else {}
+        self.entradas = self._calcular(tabela, datas, grupos)
+
+    def _acrescentar(self, tabela, inicio):
+        datas = tabela.coluna(COLUNA_DATA).to_numpy(dtype="datetime64[ns]").view("i8")
+        codigos, chaves = _codigos(tabela, inicio)
+        grupos = {}
+        for codigo in np.unique(codigos):
+            chave = chaves[codigo]
+            novas = inicio + np.flatnonzero(codigos == codigo)
+            antigas = self.entradas[chave]["posicoes"] if chave in self.entradas else novas[:0]
+            grupos[chave] = _ordem_recentes(datas, np.concatenate([antigas, novas]))
+        self.entradas.update(self._calcular(tabela, datas, grupos))
+
+    @staticmethod
+    def _calcular(tabela, datas, grupos):
+        canal = tabela.coluna("canal")
+        canais = canal.cat.categories
+        codigos_canal = canal.cat.codes.to_numpy()
+        # conteúdos das três interações mais recentes de cada segurado, convertidos de uma vez
+        topo = {chave: pos[:3] for chave, pos in grupos.items()}
+        todos = np.concatenate(list(topo.values())) if topo else np.empty(0, dtype=np.int64)
+        textos = iter(tabela.coluna("conteudo").iloc[todos].astype(str).tolist())
+        entradas = {}
+        for chave, pos in grupos.items():
+            validas = datas[pos][datas[pos] != _NAT]
+            contagem_canais = np.bincount(codigos_canal[pos], minlength=len(canais))
+            entradas[chave] = {
+                "total": len(pos),
+                "primeira": validas[-1] if len(validas) else None,
+                "ultima": validas[0] if len(validas) else None,
+                "canal_mais_usado": canais[contagem_canais.argmax()] if len(pos) else "—",
+                "status": interpretar_status(" ".join(next(textos) for _ in topo[chave])),
+                "posicoes": pos,
+            }
+        return entradas
+
+    def entrada(self, segurado):
+        return self.entradas.get(str(segurado).lower())
+
+    def agregados(self, tabela, segurado):
+        """Mesmo formato de ConsultaTabela.agregados para o filtro só por segurado."""
+        e = self.entrada(segurado)
+        pos = e["posicoes"]
+        por_mes = tabela.coluna("ano_mes").iloc[pos].value_counts().sort_index()
+        por_mes.index = por_mes.index.astype(str)
+        return {
+            "total": e["total"],
+            "primeira": pd.Timestamp(e["primeira"]) if e["primeira"] is not None else pd.NaT,
+            "ultima": pd.Timestamp(e["ultima"]) if e["ultima"] is not None else pd.NaT,
+            "canal_mais_usado": e["canal_mais_usado"],
+            "por_canal": contagem(tabela.coluna("canal").iloc[pos]),
+            "por_integracao": contagem(tabela.coluna("integracao").iloc[pos]),
+            "por_mes": por_mes,
+        }
+
+    def ultimas(self, tabela, segurado, n=50, colunas=COLUNAS_EXIBICAO):
+        return tabela.view(colunas, self.entrada(segurado)["posicoes"][:n])
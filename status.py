@@ -0,0 +1,47 @@
+import json
+import os
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# --------------------------
+# Classificação automática de status pelo conteúdo
+# --------------------------
+# As regras ficam em status_regras.json (em ordem de prioridade): a primeira regra com alguma
+# palavra-chave presente no texto define o status; sem nenhuma, vale o status "padrao".
+# Cada lista de palavras é compilada em uma única regex para rodar vetorizada na coluna.
+
+CAMINHO_REGRAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "status_regras.json")
+
+@lru_cache(maxsize=4)
+def carregar_regras(caminho=CAMINHO_REGRAS):
+    with open(caminho, encoding="utf-8") as f:
+        config = json.load(f)
+    regras = []
+    for regra in config["regras"]:
+        palavras = [p.lower() for p in regra["palavras"] if p]
+        padrao = "|".join(re.escape(p) for p in palavras)
+        regras.append((regra["status"], re.compile(padrao)))
+    return regras, config["padrao"]
+
+def categorias_status(caminho=CAMINHO_REGRAS):
+    regras, padrao = carregar_regras(caminho)
+    return [s for s, _ in regras] + [padrao]
+
+def interpretar_status(texto, caminho=CAMINHO_REGRAS):
+    regras, padrao = carregar_regras(caminho)
+    t = str(texto).lower()
+    for status, regex in regras:
+        if regex.search(t):
+            return status
+    return padrao
+
+def classificar_serie(serie, caminho=CAMINHO_REGRAS):
+    """Versão vetorizada de `serie.apply(interpretar_status)`; retorna uma coluna categórica."""
+    regras, padrao = carregar_regras(caminho)
+    texto = serie.astype(str).str.lower()
+    condicoes = [texto.str.contains(regex.pattern, regex=True).fillna(False).to_numpy(dtype=bool)
+                 for _, regex in regras]
+    valores = np.select(condicoes, [s for s, _ in regras], default=padrao) if condicoes else np.full(len(texto), padrao)
+    return pd.Series(pd.Categorical(valores, categories=categorias_status(caminho)), index=serie.index, name="status")
@@ -0,0 +1,124 @@
+import pandas as pd
+from datas import parse_date_series
+from status import classificar_serie
+
+# --------------------------
+# Representação compacta da tabela de interações
+# --------------------------
+# Uma única instância por versão dos dados é compartilhada entre as sessões. Colunas de
+# baixa cardinalidade viram categorias, o conteúdo fica em string pyarrow, a data é uma só
+# coluna datetime64 e o status já vem classificado; colunas derivadas (data formatada, ano_mes, conteudo_lower) são
+# calculadas apenas no primeiro acesso.
+
+COLUNAS_CATEGORICAS = ["segurado", "canal", "tipo_evento", "integracao"]
+COLUNA_DATA = "data_hora_parsed"
+
+def make_unique_cols(cols, reservados=()):
+    # sufixa nomes repetidos (ou que colidem com nomes reservados) com _1, _2, ...
+    novos = []
+    seen = {c: 0 for c in reservados}
+    for c in cols:
+        if c in seen:
+            seen[c] += 1
+            new = f"{c}_{seen[c]}"
+        else:
+            seen[c] = 0
+            new = c
+        novos.append(new)
+    return novos
+
+def _data_formatada(tabela):
+    datas = tabela.frame[COLUNA_DATA]
+    return datas.dt.strftime("%d/%m/%Y %H:%M").where(datas.notna(), "")
+
+def _ano_mes(tabela):
+    return tabela.frame[COLUNA_DATA].dt.to_period("M")
+
+def _conteudo_lower(tabela):
+    return tabela.frame["conteudo"].str.lower()
+
+DERIVADAS = {
+    "data_hora": _data_formatada,
+    "ano_mes": _ano_mes,
+    "conteudo_lower": _conteudo_lower,
+}
+
+class TabelaInteracoes:
+    """Tabela de interações em formato compacto, com colunas derivadas sob demanda."""
+
+    def __init__(self, df):
+        base = {COLUNA_DATA: parse_date_series(df["data_hora"]).reset_index(drop=True)}
+        for c in ["segurado", "canal", "conteudo", "tipo_evento", "integracao"]:
+            tipo = "category" if c in COLUNAS_CATEGORICAS else "string[pyarrow]"
+            base[c] = df[c].astype(str).str.strip().astype(tipo).reset_index(drop=True)
+        # status (interpretação automática do conteúdo) classificado uma vez, na carga
+        base["status"] = classificar_serie(base["conteudo"])
+        # demais colunas da planilha são mantidas como vieram (com nomes únicos)
+        extras = [c for c in df.columns if c not in base and c != "data_hora"]
+        nomes = make_unique_cols(extras, reservados=list(base) + list(DERIVADAS))
+        for original, nome in zip(extras, nomes):
+            base[nome] = df[original].reset_index(drop=True)
+        self.frame = pd.DataFrame(base)
+        self._derivadas = {}
+        self._ordens = {}
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def colunas(self):
+        # colunas disponíveis para exibição: data formatada primeiro, depois base e derivadas
+        return ["data_hora"] + [c for c in self.frame.columns] + [c for c in DERIVADAS if c != "data_hora"]
+
+    def coluna(self, nome):
+        if nome in self.frame.columns:
+            return self.frame[nome]
+        if nome not in self._derivadas:
+            self._derivadas[nome] = DERIVADAS[nome](self).rename(nome)
+        return self._derivadas[nome]
+
+    def ordem(self, nome, crescente=True):
+        """Permutação (posições) que ordena a tabela pela coluna; calculada uma vez por coluna/sentido."""
+        chave = (nome, crescente)
+        if chave not in self._ordens:
+            # a data formatada é ordenada pela coluna datetime64
+            serie = self.coluna(COLUNA_DATA if nome == "data_hora" else nome)
+            self._ordens[chave] = serie.sort_values(ascending=crescente, kind="stable").index.to_numpy()
+        return self._ordens[chave]
+
+    def view(self, colunas, posicoes=None):
+        """Monta um DataFrame só com as colunas (e linhas, por posição) pedidas."""
+        dados = {}
+        for c in colunas:
+            serie = self.coluna(c)
+            dados[c] = serie if posicoes is None else serie.iloc[posicoes]
+        return pd.DataFrame(dados)
+
+    def memory_usage(self):
+        base = int(self.frame.memory_usage(deep=True).sum())
+        derivadas = int(sum(s.memory_usage(deep=True) for s in self._derivadas.values()))
+        return base + derivadas
+
+def representacao_legada(df):
+    # reproduz a representação anterior: tudo object + colunas derivadas + cópia em tabela_full
+    legado = df.copy()
+    for c in ["segurado", "canal", "conteudo", "tipo_evento", "integracao"]:
+        legado[c] = legado[c].astype(str).str.strip().astype(object)
+    legado["data_hora_parsed"] = parse_date_series(legado["data_hora"])
+    legado["data_hora_fmt"] = legado["data_hora_parsed"].dt.strftime("%d/%m/%Y %H:%M").astype(object)
+    legado["ano_mes"] = legado["data_hora_parsed"].dt.to_period("M")
+    legado["conteudo_lower"] = legado["conteudo"].str.lower().astype(object)
+    return legado
+
+def relatorio_memoria(df, tabela):
+    """Compara a memória da representação legada (df + cópia tabela_full) com a compacta."""
+    legado = int(representacao_legada(df).memory_usage(deep=True).sum())
+    linhas = [
+        {"representação": "legada (object + derivadas, df + tabela_full)", "bytes": 2 * legado},
+        {"representação": "compacta (base)", "bytes": int(tabela.frame.memory_usage(deep=True).sum())},
+        {"representação": "compacta (base + derivadas já calculadas)", "bytes": tabela.memory_usage()},
+    ]
+    rel = pd.DataFrame(linhas)
+    rel["MB"] = (rel["bytes"] / 1024 ** 2).round(2)
+    rel["% da legada"] = (100 * rel["bytes"] / rel["bytes"].iloc[0]).round(1)
+    return rel
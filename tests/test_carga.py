@@ -0,0 +1,150 @@
+import pytest
+
+pytest.importorskip("gspread")
+
+import pandas as pd
+import planilha
+from carga import COLUNA_FONTE, CargaFragmentada, CargaPlanilha
+from espelho import EspelhoLocal
+from planilha import AcessoPlanilha, Fonte
+from planilha_fake import ClienteFake
+
+# CargaPlanilha e CargaFragmentada contra o backend falso: leitura incremental, delta,
+# união das fontes e espelho local
+
+CABECALHO = ["data_hora", "segurado", "canal", "conteudo", "tipo_evento", "integracao"]
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    monkeypatch.setattr(planilha.time, "sleep", lambda segundos: None)
+
+def _linhas(prefixo, n, dia=1):
+    return [[f"{dia:02d}/02/2024 10:{i % 60:02d}", f"{prefixo}{i}", "E-mail", f"conteúdo {i}", "Outros", "RCV"]
+            for i in range(n)]
+
+def _cliente(**abas):
+    # uma planilha por aba nomeada (id = nome)
+    return ClienteFake({nome: {"log": [CABECALHO] + linhas} for nome, linhas in abas.items()})
+
+def _aba(cliente, nome):
+    return cliente.arquivos[nome].sheet1
+
+def test_leitura_incremental_e_delta():
+    cliente = _cliente(p=_linhas("A", 10))
+    acesso = AcessoPlanilha(cliente.fabrica)
+    carga = CargaPlanilha(lambda: acesso, ttl=0, planilha="p")
+    df, versao, delta = carga.carregar()
+    assert (len(df), versao, delta) == (10, 1, None)
+
+    _aba(cliente, "p").linhas += _linhas("B", 3)
+    df, versao, delta = carga.carregar()
+    assert (len(df), versao, delta) == (13, 2, (1, 10))
+    assert list(df["segurado"].iloc[-3:]) == ["B0", "B1", "B2"]
+
+    # sem linhas novas: mesma versão e o mesmo delta
+    assert carga.carregar()[1:] == (2, (1, 10))
+
+def test_dentro_do_ttl_nao_chama_a_api():
+    cliente = _cliente(p=_linhas("A", 5))
+    acesso = AcessoPlanilha(cliente.fabrica)
+    carga = CargaPlanilha(lambda: acesso, ttl=300, planilha="p")
+    carga.carregar()
+    chamadas = cliente.chamadas
+    _aba(cliente, "p").linhas += _linhas("B", 2)
+    assert len(carga.carregar()[0]) == 5
+    assert cliente.chamadas == chamadas
+    carga.invalidar()
+    df, versao, delta = carga.carregar()
+    assert (len(df), versao, delta) == (7, 2, None)
+
+def test_cabecalho_alterado_rele_tudo():
+    cliente = _cliente(p=_linhas("A", 4))
+    acesso = AcessoPlanilha(cliente.fabrica)
+    carga = CargaPlanilha(lambda: acesso, ttl=0, planilha="p")
+    carga.carregar()
+    aba = _aba(cliente, "p")
+    aba.linhas[0] = CABECALHO + ["assunto"]
+    df, versao, delta = carga.carregar()
+    assert "assunto" in df.columns and (versao, delta) == (2, None)
+
+def test_api_indisponivel_usa_o_espelho():
+    cliente = _cliente(p=_linhas("A", 6))
+    acesso = AcessoPlanilha(cliente.fabrica, max_tentativas=2)
+    espelho = EspelhoLocal(":memory:")
+    carga = CargaPlanilha(lambda: acesso, espelho, ttl=0, planilha="p")
+    carga.carregar()
+    assert espelho.tamanho() == 6
+    cliente.falhas = [503] * 10
+    avisos = []
+    df, versao, _ = carga.carregar(avisar=avisos.append)
+    assert len(df) == 6 and versao == 2 and len(avisos) == 1
+    assert pd.api.types.is_datetime64_any_dtype(df["data_hora"])
+
+def test_espelho_se_recupera_de_sincronizacao_falha(monkeypatch):
+    cliente = _cliente(p=_linhas("A", 100))
+    acesso = AcessoPlanilha(cliente.fabrica)
+    espelho = EspelhoLocal(":memory:")
+    carga = CargaPlanilha(lambda: acesso, espelho, ttl=0, planilha="p")
+    carga.carregar()
+    _aba(cliente, "p").linhas += _linhas("B", 5)
+
+    def falha(*args, **kwargs):
+        raise OSError("disco cheio")
+    with monkeypatch.context() as m:
+        m.setattr(espelho, "sincronizar", falha)
+        carga.carregar()
+    assert espelho.tamanho() == 100
+    _aba(cliente, "p").linhas += _linhas("C", 5)
+    carga.carregar()
+    assert espelho.tamanho() == 110
+
+def _fragmentada(cliente, **opcoes):
+    fontes = [Fonte("2023", "a"), Fonte("2024", "b", ativa=True)]
+    acesso = AcessoPlanilha(cliente.fabrica)
+    return CargaFragmentada(lambda: acesso, fontes, **opcoes)
+
+def test_fragmentada_une_as_fontes():
+    cliente = _cliente(a=_linhas("A", 4), b=_linhas("B", 3))
+    carga = _fragmentada(cliente, ttl=0)
+    df, versao, delta = carga.carregar()
+    assert (len(df), versao, delta) == (7, 1, None)
+    assert list(df[COLUNA_FONTE].astype(str)) == ["2023"] * 4 + ["2024"] * 3
+    assert list(df[COLUNA_FONTE].cat.categories) == ["2023", "2024"]
+
+def test_fragmentada_delta_quando_so_a_ultima_fonte_cresce():
+    cliente = _cliente(a=_linhas("A", 4), b=_linhas("B", 3))
+    carga = _fragmentada(cliente, ttl=0)
+    carga.carregar()
+    _aba(cliente, "b").linhas += _linhas("N", 2)
+    df, versao, delta = carga.carregar()
+    assert (len(df), versao, delta) == (9, 2, (1, 7))
+    assert list(df["segurado"].iloc[-2:]) == ["N0", "N1"]
+    assert list(df[COLUNA_FONTE].astype(str).iloc[-2:]) == ["2024", "2024"]
+    # nada mudou: mesma versão
+    assert carga.carregar()[1] == 2
+
+def test_fragmentada_fonte_de_arquivo_muda_sem_delta():
+    cliente = _cliente(a=_linhas("A", 4), b=_linhas("B", 3))
+    carga = _fragmentada(cliente, ttl=0, ttl_arquivo=0)
+    carga.carregar()
+    _aba(cliente, "a").linhas += _linhas("V", 1)
+    df, versao, delta = carga.carregar()
+    assert (len(df), versao, delta) == (8, 2, None)
+    assert df["segurado"].iloc[4] == "V0"
+
+def test_fragmentada_somente_local_nao_muda_a_versao():
+    espelho = EspelhoLocal(":memory:")
+    espelho.sincronizar(pd.DataFrame(_linhas("A", 3), columns=CABECALHO), completa=True)
+    carga = _fragmentada(_cliente(a=[], b=[]), espelho=espelho, ttl=300, somente_local=True)
+    assert [carga.carregar()[1] for _ in range(3)] == [1, 1, 1]
+
+def test_fragmentada_rele_a_fonte_de_arquivo_que_recebeu_linhas():
+    cliente = _cliente(a=_linhas("A", 4), b=_linhas("B", 3))
+    carga = _fragmentada(cliente, ttl=300)  # fonte de arquivo sem expirar (ttl_arquivo infinito)
+    carga.carregar()
+    _aba(cliente, "a").linhas += _linhas("V", 1)
+    assert len(carga.carregar()[0]) == 7
+    carga.marcar_escrita("2023")
+    df, versao, _ = carga.carregar()
+    assert (len(df), versao) == (8, 2)
+    assert df["segurado"].iloc[4] == "V0"
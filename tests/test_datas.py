@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datas import parse_date_series, parse_date_value
+
+# parse_date_series deve dar exatamente o mesmo resultado da conversão célula a célula
+
+CASOS = {
+    "seriais_inteiros": [45000, 44927, np.int64(45292), 45000.0],
+    "seriais_texto": ["45000", " 45000 ", "45000,5", "45000.25", "45000,"],
+    "seriais_fracionados": [45000.25, 44927.5, 45292.999988],
+    "vazios": [None, np.nan, "", "   "],
+    "infinitos": [np.inf, -np.inf, float("inf")],
+    "timestamps": [pd.Timestamp("2024-01-02 10:00"), pd.Timestamp("2023-12-31")],
+    "mes_primeiro_antes": ["12/13/2024 09:00", "01/02/2025 10:30", "05/03/2025 11:00"],
+    "iso": ["2024-01-12", "2024-01-12 08:00"],
+    "dd_mm": ["01/02/2024", "01/02/2024 10:30", "31/12/2023 23:59", "1/2/2024", "31/02/2024", "sem data"],
+}
+
+def _comparar(valores, dtype=object):
+    serie = pd.Series(valores, dtype=dtype)
+    esperado = serie.apply(parse_date_value).astype("datetime64[ns]")
+    obtido = parse_date_series(serie).astype("datetime64[ns]")
+    pd.testing.assert_series_equal(obtido, esperado, check_names=False)
+
+@pytest.mark.parametrize("caso", list(CASOS))
+def test_igual_a_conversao_por_celula(caso):
+    _comparar(CASOS[caso])
+
+def test_mistura_de_todos_os_formatos():
+    _comparar([v for valores in CASOS.values() for v in valores])
+
+def test_serial_inteiro_com_texto():
+    # caso que derrubava o painel no pandas 3 (unit='d')
+    resultado = parse_date_series(pd.Series([45000, "01/02/2024"], dtype=object))
+    assert list(resultado) == [pd.Timestamp("2023-03-15"), pd.Timestamp("2024-02-01")]
+
+def test_coluna_numerica():
+    _comparar([45000.0, 45000.5, np.nan, np.inf], dtype="float64")
+    _comparar([45000, 44927], dtype="int64")
@@ -0,0 +1,83 @@
+import pytest
+
+gspread = pytest.importorskip("gspread")
+
+import planilha
+from planilha import AcessoPlanilha, Fonte, SHEET_ID, fonte_destino, fontes_configuradas
+from planilha_fake import ClienteFake
+
+# AcessoPlanilha contra o backend falso: retentativas, 401 e operações não idempotentes
+
+CABECALHO = ["data_hora", "segurado", "canal", "conteudo", "tipo_evento", "integracao"]
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    monkeypatch.setattr(planilha.time, "sleep", lambda segundos: None)
+
+def _acesso(max_tentativas=5):
+    cliente = ClienteFake({SHEET_ID: {"log": [CABECALHO, ["01/02/2024 10:00", "A", "E-mail", "oi", "Outros", "RCV"]]}})
+    fabricados = []
+
+    def fabrica():
+        fabricados.append(1)
+        return cliente
+    acesso = AcessoPlanilha(fabrica, max_tentativas=max_tentativas)
+    acesso.worksheet()  # abre a aba antes: as falhas injetadas caem na operação
+    return cliente, acesso, fabricados
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_repete_erros_temporarios(status):
+    cliente, acesso, _ = _acesso()
+    cliente.falhas = [status, status]
+    assert acesso.executar("row_values", 1) == CABECALHO
+    stats = acesso.estatisticas()
+    assert stats["retentativas"] == 2 and stats["erros"] == 2
+
+def test_desiste_depois_de_max_tentativas():
+    cliente, acesso, _ = _acesso(max_tentativas=3)
+    cliente.falhas = [503] * 5
+    with pytest.raises(gspread.exceptions.APIError):
+        acesso.executar("row_values", 1)
+    assert acesso.estatisticas()["erros"] == 3
+    assert cliente.falhas == [503, 503]
+
+def test_nao_repete_erro_definitivo():
+    cliente, acesso, _ = _acesso()
+    cliente.falhas = [400]
+    with pytest.raises(gspread.exceptions.APIError):
+        acesso.executar("row_values", 1)
+    assert acesso.estatisticas()["retentativas"] == 0
+
+def test_401_recria_o_cliente_uma_vez():
+    cliente, acesso, fabricados = _acesso()
+    cliente.falhas = [401]
+    assert acesso.executar("row_values", 1) == CABECALHO
+    assert len(fabricados) == 2
+    assert acesso.estatisticas()["autorizacoes"] == 2
+
+def test_401_repetido_e_propagado():
+    cliente, acesso, fabricados = _acesso()
+    # 401 na operação e de novo depois de recriar o cliente (a abertura da aba também falha)
+    cliente.falhas = [401, 401]
+    with pytest.raises(gspread.exceptions.APIError):
+        acesso.executar("row_values", 1)
+    assert len(fabricados) == 2
+
+def test_append_nao_repete_5xx():
+    cliente, acesso, _ = _acesso()
+    cliente.falhas = [503]
+    with pytest.raises(gspread.exceptions.APIError):
+        acesso.executar("append_rows", [["x"] * 6], idempotente=False)
+    cliente.falhas = [429]
+    acesso.executar("append_rows", [["y"] * 6], idempotente=False)
+    assert [l[0] for l in cliente.arquivos[SHEET_ID].sheet1.linhas[2:]] == ["y"]
+
+def test_fontes_configuradas_e_destino():
+    fontes = fontes_configuradas([{"nome": "2023", "planilha": "p23", "ano": 2023}, {"nome": "atual", "planilha": "p"}])
+    assert fontes[-1].ativa and not fontes[0].ativa
+    assert fonte_destino(fontes, "15/06/2023 10:00").nome == "2023"
+    assert fonte_destino(fontes, "15/06/2024 10:00").nome == "atual"
+    assert fonte_destino(fontes, "").nome == "atual"
+    with pytest.raises(ValueError):
+        fontes_configuradas([{"nome": "a"}, {"nome": "a"}])
+    assert fontes_configuradas(None) == [Fonte("principal", ativa=True)]